@@ -1,120 +1,463 @@
 # analyze.py
 # Analyze all funds changes
+import datetime
 import numpy as np
-from database import AssetValue, FundValue, SessionLocal
-from sqlalchemy import and_
+from cache import portfolio_cached
+from database import DEFAULT_PORTFOLIO, AssetValue, FundValue, SessionLocal
+from rollups import choose_resolution, get_rollup_pivot, period_end
+from sqlalchemy import (
+    Date,
+    and_,
+    bindparam,
+    func,
+    literal,
+    select,
+    text,
+    union_all,
+)
 import pandas as pd
+from summary_calculator import SummaryCalculator
 
 
-def get_all_funds_changes(start_date, end_date):
+# Column name of the series dimension for each kind of holding
+KINDS = {"fund": "fund_code", "asset": "category"}
+
+BACKENDS = ("pandas", "sql")
+
+# Daily values of a range on a dense (kind, date) x series grid: every series
+# gets a row for every date its kind has data on, missing values count as 0
+# (like the filled pivots of the pandas backend)
+_SQL_GRID = """
+WITH vals AS (
+    SELECT 'fund' AS kind, fund_code AS series, date, value_tl
+    FROM fund_values
+    WHERE portfolio = :portfolio AND date >= :start_date AND date <= :end_date
+    UNION ALL
+    SELECT 'asset', category, date, value_tl
+    FROM asset_values
+    WHERE portfolio = :portfolio AND date >= :start_date AND date <= :end_date
+),
+dates AS (SELECT DISTINCT kind, date FROM vals),
+series AS (SELECT DISTINCT kind, series FROM vals),
+grid AS (
+    SELECT d.kind, s.series, d.date, COALESCE(v.value_tl, 0.0) AS value
+    FROM dates d
+    JOIN series s ON s.kind = d.kind
+    LEFT JOIN vals v ON v.kind = d.kind AND v.series = s.series AND v.date = d.date
+)
+"""
+
+# Change and % change to the previous date, 0 on the first date and where the
+# previous value is 0 (pandas gives inf / NaN there, which is replaced by 0)
+_SQL_CHANGES = """
+SELECT kind, {series} AS series, date, value,
+    COALESCE(value - prev, 0.0) AS change,
+    CASE WHEN prev IS NULL OR prev = 0 THEN 0.0
+        ELSE (value - prev) * 100.0 / prev END AS pct_change
+FROM (
+    SELECT *, LAG(value) OVER (PARTITION BY kind{partition} ORDER BY date) AS prev
+    FROM {source}
+)
+"""
+
+_SQL_SERIES_CHANGES = _SQL_GRID + _SQL_CHANGES.format(
+    series="series", partition=", series", source="grid"
+)
+
+_SQL_TOTAL_CHANGES = _SQL_GRID + _SQL_CHANGES.format(
+    series="NULL",
+    partition="",
+    source="(SELECT kind, date, SUM(value) AS value FROM grid GROUP BY kind, date)",
+)
+
+# First and last value of every series within the range, one row per series
+_SQL_SUMMARIES = _SQL_GRID + """
+SELECT DISTINCT kind, series,
+    FIRST_VALUE(value) OVER w AS start_value,
+    LAST_VALUE(value) OVER w AS end_value
+FROM grid
+WINDOW w AS (
+    PARTITION BY kind, series ORDER BY date
+    ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+)
+"""
+
+
+def _resolve(resolution, start_date, end_date):
+    if resolution == "auto":
+        return choose_resolution(start_date, end_date)
+    return resolution
+
+
+def _get_daily_pivots(start_date, end_date, portfolio):
     """
-    Returns the changes of all funds within the selected date range.
-    - Daily TL and % changes for each fund
-    - Total portfolio change in TL and % (based on first and last date only)
-    - Top 5 performing funds (by TL and %)
-    - Bottom 5 performing funds (by TL and %)
+    Reads fund and asset values of a range in a single query.
+    Returns {kind: pivot (rows = date, columns = fund code / category) or None}.
     """
+    funds = select(
+        literal("fund").label("kind"),
+        FundValue.fund_code.label("series"),
+        FundValue.date,
+        FundValue.value_tl,
+    ).where(
+        and_(
+            FundValue.portfolio == portfolio,
+            FundValue.date >= start_date,
+            FundValue.date <= end_date,
+        )
+    )
+    assets = select(
+        literal("asset"), AssetValue.category, AssetValue.date, AssetValue.value_tl
+    ).where(
+        and_(
+            AssetValue.portfolio == portfolio,
+            AssetValue.date >= start_date,
+            AssetValue.date <= end_date,
+        )
+    )
     session = SessionLocal()
+    query = session.execute(union_all(funds, assets)).all()
+    session.close()
+
+    df = pd.DataFrame(query, columns=["kind", "series", "date", "value_tl"])
+    pivots = {}
+    for kind, series_name in KINDS.items():
+        rows = df[df["kind"] == kind]
+        if rows.empty:
+            pivots[kind] = None
+            continue
+        # Pivot table: rows = date, columns = fund code / asset category
+        pivots[kind] = (
+            rows.pivot(index="date", columns="series", values="value_tl")
+            .sort_index()
+            .fillna(0)
+            .rename_axis(columns=series_name)
+        )
+    return pivots
+
+
+def value_changes(values):
+    """Returns the TL and % changes between consecutive rows of every column."""
+    changes = values.diff().fillna(0)
+    pct_changes = (values.pct_change().replace([np.inf, -np.inf], 0) * 100).fillna(0)
+    return changes, pct_changes
+
 
-    # Query all data within the specified date range
-    query = (
-        session.query(FundValue.date, FundValue.fund_code, FundValue.value_tl)
-        .filter(and_(FundValue.date >= start_date, FundValue.date <= end_date))
-        .order_by(FundValue.date)
-        .all()
+def row_totals(pivot):
+    """
+    Returns the sum of every row of a pivot. The values are summed in one
+    fixed order per row, so a range gives bit-identical totals whether it
+    is summed at once or chunk by chunk.
+    """
+    values = np.ascontiguousarray(pivot.to_numpy(dtype=float))
+    return pd.Series(values.sum(axis=1), index=pivot.index)
+
+
+def _compute_changes(pivots):
+    """
+    Runs the change pipeline for funds and assets.
+    When both share the same dates (the usual case) their columns are combined
+    into one wide frame, so the changes are computed in a single pass.
+    """
+    pivots = {kind: pivot for kind, pivot in pivots.items() if pivot is not None}
+    if not pivots:
+        return {}
+    indexes = [pivot.index for pivot in pivots.values()]
+    if all(index.equals(indexes[0]) for index in indexes):
+        batches = [list(pivots)]
+    else:
+        batches = [[kind] for kind in pivots]
+
+    parts = {}
+    for kinds in batches:
+        values = pd.concat({kind: pivots[kind] for kind in kinds}, axis=1)
+        totals = pd.DataFrame({kind: row_totals(pivots[kind]) for kind in kinds})
+        changes, pct_changes = value_changes(values)
+        total_changes, total_pct_changes = value_changes(totals)
+        for kind in kinds:
+            series_name = pivots[kind].columns.name
+            parts[kind] = {
+                "pivot": pivots[kind],
+                "changes": changes[kind].rename_axis(columns=series_name),
+                "pct_changes": pct_changes[kind].rename_axis(columns=series_name),
+                "total": totals[kind].fillna(0),
+                "total_change": total_changes[kind],
+                "total_pct_change": total_pct_changes[kind],
+            }
+    return parts
+
+
+def _query_long(statement, start_date, end_date, portfolio):
+    """Runs one of the SQL statements above and returns its rows as a DataFrame."""
+    session = SessionLocal()
+    result = session.execute(
+        text(statement)
+        .bindparams(
+            bindparam("start_date", type_=Date), bindparam("end_date", type_=Date)
+        )
+        .columns(date=Date),
+        {"portfolio": portfolio, "start_date": start_date, "end_date": end_date},
     )
+    rows = pd.DataFrame(result.all(), columns=list(result.keys()))
     session.close()
+    return rows
 
-    if not query:
-        print("❌ No data available for the selected date range.")
-        return None
 
-    df = pd.DataFrame(query, columns=["date", "fund_code", "value_tl"])
+def _sql_daily_parts(start_date, end_date, portfolio):
+    """
+    Computes the same parts as _compute_changes on daily data, with the changes,
+    % changes and per-day totals done by SQLite window functions.
+    Only the finished values cross into Python to be reshaped.
+    """
+    series_rows = _query_long(_SQL_SERIES_CHANGES, start_date, end_date, portfolio)
+    total_rows = _query_long(_SQL_TOTAL_CHANGES, start_date, end_date, portfolio)
 
-    # Pivot table: rows = date, columns = fund code
-    pivot = (
-        df.pivot(index="date", columns="fund_code", values="value_tl")
-        .sort_index()
-        .fillna(0)
-    )
+    parts = {}
+    for kind, series_name in KINDS.items():
+        rows = series_rows[series_rows["kind"] == kind]
+        if rows.empty:
+            continue
+        wide = {
+            column: rows.pivot(index="date", columns="series", values=column)
+            .sort_index()
+            .rename_axis(columns=series_name)
+            for column in ("value", "change", "pct_change")
+        }
+        totals = (
+            total_rows[total_rows["kind"] == kind].set_index("date").sort_index()
+        )
+        parts[kind] = {
+            "pivot": wide["value"],
+            "changes": wide["change"],
+            "pct_changes": wide["pct_change"],
+            "total": totals["value"].rename(kind),
+            "total_change": totals["change"].rename(kind),
+            "total_pct_change": totals["pct_change"].rename(kind),
+        }
+    return parts
 
-    # Daily changes for each fund
-    fund_changes = pivot.diff().fillna(0)
-    fund_pct_changes = (pivot.pct_change().replace([np.inf, -np.inf], 0) * 100).fillna(
-        0
-    )
-    total = pivot.sum(axis=1).fillna(0)
-    total_funds_change = total.diff().fillna(0)
-    total_pct_change = (total.pct_change().replace([np.inf, -np.inf], 0) * 100).fillna(
-        0
+
+def list_series(kind, start_date, end_date, portfolio=DEFAULT_PORTFOLIO):
+    """Returns the sorted fund codes / categories with values in the range."""
+    model = FundValue if kind == "fund" else AssetValue
+    column = getattr(model, KINDS[kind])
+    session = SessionLocal()
+    series = sorted(
+        row[0]
+        for row in session.query(column)
+        .filter(
+            and_(
+                model.portfolio == portfolio,
+                model.date >= start_date,
+                model.date <= end_date,
+            )
+        )
+        .distinct()
     )
+    session.close()
+    return series
 
-    result = {
-        "pivot": pivot,
-        "fund_changes": fund_changes,
-        "fund_pct_changes": fund_pct_changes,
-        "total_funds": total,
-        "total_funds_change": total_funds_change,
-        "total_pct_change": total_pct_change,
-    }
 
-    return result
+def iter_change_chunks(
+    kind, start_date, end_date, portfolio=DEFAULT_PORTFOLIO, period="month"
+):
+    """
+    Walks a date range one day, week or month at a time and yields
+    (pivot, changes, pct_changes) of each chunk, with the same columns (every
+    series of the whole range) in every chunk. The last row of the previous
+    chunk is carried over, so the changes equal those of the whole range
+    computed at once. Only one chunk is held in memory.
+    kind: "fund" or "asset"
+    """
+    model = FundValue if kind == "fund" else AssetValue
+    series_column = getattr(model, KINDS[kind])
+    series = list_series(kind, start_date, end_date, portfolio)
+    session = SessionLocal()
+    try:
+        previous = None
+        chunk_start = start_date
+        while series and chunk_start <= end_date:
+            chunk_end = chunk_start
+            if period != "day":
+                chunk_end = min(period_end(chunk_start, period), end_date)
+            rows = session.query(model.date, series_column, model.value_tl).filter(
+                and_(
+                    model.portfolio == portfolio,
+                    model.date >= chunk_start,
+                    model.date <= chunk_end,
+                )
+            )
+            df = pd.DataFrame(rows.all(), columns=["date", "series", "value_tl"])
+            chunk_start = chunk_end + datetime.timedelta(days=1)
+            if df.empty:
+                continue
+
+            pivot = (
+                df.pivot(index="date", columns="series", values="value_tl")
+                .reindex(columns=series)
+                .sort_index()
+                .fillna(0)
+                .rename_axis(columns=KINDS[kind])
+            )
+            if previous is None:
+                changes, pct_changes = value_changes(pivot)
+            else:
+                changes, pct_changes = value_changes(pd.concat([previous, pivot]))
+                changes, pct_changes = changes.iloc[1:], pct_changes.iloc[1:]
+            previous = pivot.iloc[[-1]]
+            yield pivot, changes, pct_changes
+    finally:
+        session.close()
 
 
-def get_all_assets_changes(start_date, end_date):
+@portfolio_cached
+def get_all_changes(
+    start_date,
+    end_date,
+    portfolio=DEFAULT_PORTFOLIO,
+    resolution="auto",
+    backend="pandas",
+):
     """
-    Returns the daily TL and % changes for all asset categories:
-    - precious_metals_tl
-    - crypto_tl
-    - physical_gold_tl
+    Returns (fund_result, asset_result) for the selected date range, see
+    get_all_funds_changes and get_all_assets_changes. Either is None if
+    there is no data of that kind.
+    resolution: "day", "week", "month" or "auto" (coarsest one fitting the range).
+    Weekly/monthly results are read from the rollup tables; their first and
+    last rows still hold the exact values of the first and last day.
+    backend: "pandas" computes the daily changes in pandas, "sql" in SQLite
+    (same results). Rollup resolutions are already aggregated by SQLite and
+    always finish in pandas.
     """
-    session = SessionLocal()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+    resolution = _resolve(resolution, start_date, end_date)
+    if resolution == "day" and backend == "sql":
+        parts = _sql_daily_parts(start_date, end_date, portfolio)
+    else:
+        if resolution == "day":
+            pivots = _get_daily_pivots(start_date, end_date, portfolio)
+        else:
+            pivots = {
+                kind: get_rollup_pivot(
+                    kind, start_date, end_date, resolution, portfolio
+                )
+                for kind in KINDS
+            }
+        parts = _compute_changes(pivots)
 
-    query = (
-        session.query(
-            AssetValue.date,
-            AssetValue.precious_metals_tl,
-            AssetValue.crypto_tl,
-            AssetValue.physical_gold_tl,
-        )
-        .filter(and_(AssetValue.date >= start_date, AssetValue.date <= end_date))
-        .order_by(AssetValue.date)
-        .all()
+    fund_result = None
+    if "fund" in parts:
+        funds = parts["fund"]
+        fund_result = {
+            "pivot": funds["pivot"],
+            "fund_changes": funds["changes"],
+            "fund_pct_changes": funds["pct_changes"],
+            "total_funds": funds["total"],
+            "total_funds_change": funds["total_change"],
+            "total_pct_change": funds["total_pct_change"],
+            "resolution": resolution,
+        }
+
+    asset_result = None
+    if "asset" in parts:
+        assets = parts["asset"]
+        asset_result = {
+            "pivot": assets["pivot"],  # TL values per category
+            "asset_changes": assets["changes"],  # Daily TL changes
+            "asset_pct_changes": assets["pct_changes"],  # Daily % changes
+            "total_assets": assets["total"],  # Total asset value per day
+            "total_assets_change": assets["total_change"],  # Daily TL change of total
+            "total_pct_change": assets["total_pct_change"],  # Daily % change of total
+            "resolution": resolution,  # "day", "week" or "month"
+        }
+
+    return fund_result, asset_result
+
+
+def get_all_funds_changes(
+    start_date,
+    end_date,
+    portfolio=DEFAULT_PORTFOLIO,
+    resolution="auto",
+    backend="pandas",
+):
+    """
+    Returns the changes of all funds within the selected date range.
+    - Daily TL and % changes for each fund
+    - Total portfolio change in TL and % (based on first and last date only)
+    - Top 5 performing funds (by TL and %)
+    - Bottom 5 performing funds (by TL and %)
+    """
+    fund_result, _ = get_all_changes(
+        start_date,
+        end_date,
+        portfolio=portfolio,
+        resolution=resolution,
+        backend=backend,
     )
-    session.close()
+    if fund_result is None:
+        print("❌ No data available for the selected date range.")
+    return fund_result
 
-    if not query:
+
+def get_all_assets_changes(
+    start_date,
+    end_date,
+    portfolio=DEFAULT_PORTFOLIO,
+    resolution="auto",
+    backend="pandas",
+):
+    """
+    Returns the daily TL and % changes for all asset categories
+    (e.g. precious_metals, crypto, physical_gold).
+    """
+    _, asset_result = get_all_changes(
+        start_date,
+        end_date,
+        portfolio=portfolio,
+        resolution=resolution,
+        backend=backend,
+    )
+    if asset_result is None:
         print("❌ No asset data available for the selected date range.")
-        return None
+    return asset_result
 
-    df = (
-        pd.DataFrame(
-            query,
-            columns=["date", "precious_metals_tl", "crypto_tl", "physical_gold_tl"],
-        )
-        .set_index("date")
+
+@portfolio_cached
+def get_series_summaries(start_date, end_date, portfolio=DEFAULT_PORTFOLIO):
+    """
+    Returns start value, end value and total change of every fund and asset
+    category, computed entirely in SQLite with FIRST_VALUE / LAST_VALUE, so
+    only one row per series is transferred. Matches SummaryCalculator.summarize
+    of the daily pivots. Returns {kind: DataFrame indexed by series or None}.
+    """
+    rows = _query_long(_SQL_SUMMARIES, start_date, end_date, portfolio)
+    rows["total_change_tl"] = rows["end_value"] - rows["start_value"]
+    rows["total_change_pct"] = (
+        (rows["total_change_tl"] * 100 / rows["start_value"])
+        .replace([np.inf, -np.inf], 0)
         .fillna(0)
-        .sort_index()
     )
+    rows.loc[rows["start_value"] == 0, "total_change_pct"] = 0.0
+
+    summaries = {}
+    for kind, series_name in KINDS.items():
+        kind_rows = rows[rows["kind"] == kind]
+        summaries[kind] = (
+            None
+            if kind_rows.empty
+            else kind_rows.drop(columns="kind")
+            .set_index("series")
+            .sort_index()
+            .rename_axis(series_name)
+        )
+    return summaries
 
-    # Daily TL and % changes
-    asset_changes = df.diff().fillna(0)
-    asset_pct_changes = (df.pct_change().replace([np.inf, -np.inf], 0) * 100).fillna(0)
-    total = df.sum(axis=1).fillna(0)
-    total_assets_change = total.diff().fillna(0)
-    total_pct_change = (total.pct_change().replace([np.inf, -np.inf], 0) * 100).fillna(
-        0
-    )
-    result = {
-        "pivot": df,  # TL values per category
-        "asset_changes": asset_changes,  # Daily TL changes
-        "asset_pct_changes": asset_pct_changes,  # Daily % changes
-        "total_assets": total,  # Total asset value per day
-        "total_assets_change": total_assets_change,  # Daily TL change of total assets
-        "total_pct_change": total_pct_change,  # Daily % change of total assets
-    }
 
-    return result
+def category_label(category):
+    """For UI: 'precious_metals' → 'Precious Metals'"""
+    return category.replace("_", " ").title()
 
 
 def get_top_bottom_funds(fund_result, top_n=5):
@@ -126,16 +469,57 @@ def get_top_bottom_funds(fund_result, top_n=5):
     if fund_result is None:
         return None, None
 
-    # Get start and end values
-    start_values = fund_result["pivot"].iloc[0]
-    end_values = fund_result["pivot"].iloc[-1]
-
-    # Calculate % changes
-    pct_changes = ((end_values - start_values) / start_values) * 100
-    change_tl = end_values - start_values
+    # Start and end values; a fund bought within the range (zero start) gets
+    # a 0% change, as in the summaries, instead of an infinite one
+    summary = SummaryCalculator.summarize(fund_result["pivot"].iloc[[0, -1]])
+    # Unnamed, like the rest of the results, for callers that rename column 0
+    pct_changes = summary["total_change_pct"].rename(None)
+    change_tl = summary["total_change_tl"].rename(None)
     # Find top and bottom funds
     top_funds_by_pct = pct_changes.sort_values(ascending=False).head(top_n)
     top_funds_by_tl = change_tl.sort_values(ascending=False).head(top_n)
     bottom_funds_by_pct = pct_changes.sort_values(ascending=True).head(top_n)
     bottom_funds_by_tl = change_tl.sort_values(ascending=True).head(top_n)
     return top_funds_by_pct, top_funds_by_tl, bottom_funds_by_pct, bottom_funds_by_tl
+
+
+def get_portfolios_overview(start_date, end_date):
+    """
+    Returns start value, end value and total change of every portfolio
+    (funds + assets) within the selected date range.
+    All portfolios are totalled per day in one grouped query.
+    """
+    funds = select(
+        FundValue.portfolio.label("portfolio"),
+        FundValue.date.label("date"),
+        FundValue.value_tl.label("value_tl"),
+    ).where(and_(FundValue.date >= start_date, FundValue.date <= end_date))
+    assets = select(
+        AssetValue.portfolio, AssetValue.date, AssetValue.value_tl
+    ).where(and_(AssetValue.date >= start_date, AssetValue.date <= end_date))
+    values = union_all(funds, assets).subquery()
+
+    session = SessionLocal()
+    query = session.execute(
+        select(values.c.portfolio, values.c.date, func.sum(values.c.value_tl))
+        .group_by(values.c.portfolio, values.c.date)
+        .order_by(values.c.portfolio, values.c.date)
+    ).all()
+    session.close()
+
+    if not query:
+        print("❌ No data available for the selected date range.")
+        return None
+
+    daily = pd.DataFrame(query, columns=["portfolio", "date", "total_tl"])
+    grouped = daily.groupby("portfolio")["total_tl"]
+    overview = pd.DataFrame(
+        {"start_value": grouped.first(), "end_value": grouped.last()}
+    )
+    overview["total_change_tl"] = overview["end_value"] - overview["start_value"]
+    overview["total_change_pct"] = (
+        (overview["total_change_tl"] / overview["start_value"] * 100)
+        .replace([np.inf, -np.inf], 0)
+        .fillna(0)
+    )
+    return overview
@@ -0,0 +1,271 @@
+"""
+Small asyncio-based JSON API serving the analysis results on localhost.
+
+Endpoints (all GET, dates as YYYY-MM-DD, default range is the last 7 days):
+    /portfolios                                  portfolio names + overview
+    /summary?start=&end=&portfolio=              portfolio, funds and asset summaries
+    /funds/<code>/series?start=&end=&portfolio=  daily values of one fund
+    /leaderboard?start=&end=&portfolio=&n=5      top / bottom funds
+
+Blocking database work runs in a thread pool. Every response carries an
+ETag derived from the portfolio's data version, so clients that send
+If-None-Match get a 304 without any recomputation.
+
+    python api.py --port 8765
+"""
+
+import argparse
+import asyncio
+import datetime
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from analyze import (
+    get_all_assets_changes,
+    get_all_funds_changes,
+    get_portfolios_overview,
+    get_top_bottom_funds,
+)
+from database import DEFAULT_PORTFOLIO, ensure_db, get_data_version, list_portfolios
+from outputs import json_safe
+from summary_calculator import SummaryCalculator
+
+HOST = "127.0.0.1"
+PORT = 8765
+KEEP_ALIVE_TIMEOUT = 15
+
+executor = ThreadPoolExecutor(max_workers=8)
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _date_range(params):
+    try:
+        end_date = datetime.date.fromisoformat(
+            params.get("end", datetime.date.today().isoformat())
+        )
+        start_date = datetime.date.fromisoformat(
+            params.get("start", (end_date - datetime.timedelta(days=7)).isoformat())
+        )
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Dates must be in YYYY-MM-DD format.")
+    if start_date > end_date:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Start date cannot be after end date.")
+    return start_date, end_date
+
+
+def _series_dict(series):
+    return {str(index): round(float(value), 4) for index, value in series.items()}
+
+
+def _load_results(params):
+    start_date, end_date = _date_range(params)
+    portfolio = params.get("portfolio", DEFAULT_PORTFOLIO)
+    fund_result = get_all_funds_changes(start_date, end_date, portfolio=portfolio)
+    asset_result = get_all_assets_changes(start_date, end_date, portfolio=portfolio)
+    if fund_result is None or asset_result is None:
+        raise ApiError(HTTPStatus.NOT_FOUND, "No data found for the selected period.")
+    return portfolio, start_date, end_date, fund_result, asset_result
+
+
+def handle_portfolios(params):
+    start_date, end_date = _date_range(params)
+    overview = get_portfolios_overview(start_date, end_date)
+    return {
+        "portfolios": list_portfolios(),
+        "overview": (
+            {} if overview is None else overview.round(4).to_dict(orient="index")
+        ),
+    }
+
+
+def handle_summary(params):
+    portfolio, start_date, end_date, fund_result, asset_result = _load_results(params)
+    summaries = SummaryCalculator.from_results(fund_result, asset_result)
+    summary = summaries.rename(index={"total_portfolio": "portfolio"}).to_dict(
+        orient="index"
+    )
+    return {
+        "portfolio": portfolio,
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "summary": summary,
+    }
+
+
+def handle_fund_series(params, fund_code):
+    portfolio, start_date, end_date, fund_result, _ = _load_results(params)
+    if fund_code not in fund_result["pivot"].columns:
+        raise ApiError(HTTPStatus.NOT_FOUND, f"Fund {fund_code} not found.")
+    return {
+        "portfolio": portfolio,
+        "fund_code": fund_code,
+        "value_tl": _series_dict(fund_result["pivot"][fund_code]),
+        "change_tl": _series_dict(fund_result["fund_changes"][fund_code]),
+        "change_pct": _series_dict(fund_result["fund_pct_changes"][fund_code]),
+    }
+
+
+def handle_leaderboard(params):
+    portfolio, start_date, end_date, fund_result, _ = _load_results(params)
+    try:
+        top_n = int(params.get("n", 5))
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "n must be an integer.")
+    top_pct, top_tl, bottom_pct, bottom_tl = get_top_bottom_funds(fund_result, top_n)
+    return {
+        "portfolio": portfolio,
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "top_funds_by_pct": _series_dict(top_pct),
+        "top_funds_by_tl": _series_dict(top_tl),
+        "bottom_funds_by_pct": _series_dict(bottom_pct),
+        "bottom_funds_by_tl": _series_dict(bottom_tl),
+    }
+
+
+def route(path, params):
+    """
+    Returns (handler, handler args, portfolios the result depends on) for a path.
+    None as portfolios means the result depends on every portfolio.
+    """
+    parts = [unquote(p) for p in path.strip("/").split("/") if p]
+    portfolio = params.get("portfolio", DEFAULT_PORTFOLIO)
+    if parts == ["portfolios"]:
+        return handle_portfolios, (params,), None
+    if parts == ["summary"]:
+        return handle_summary, (params,), [portfolio]
+    if parts == ["leaderboard"]:
+        return handle_leaderboard, (params,), [portfolio]
+    if len(parts) == 3 and parts[0] == "funds" and parts[2] == "series":
+        return handle_fund_series, (params, parts[1]), [portfolio]
+    raise ApiError(HTTPStatus.NOT_FOUND, f"Unknown endpoint: {path}")
+
+
+def compute_etag(target, portfolios):
+    """
+    Builds the ETag of a request from its target and the data versions of
+    the portfolios it reads (all portfolios if None). Today's date is part of
+    it because the default date range moves every day.
+    """
+    if portfolios is None:
+        portfolios = list_portfolios()
+    versions = ",".join(f"{p}={get_data_version(p)}" for p in sorted(portfolios))
+    key = f"{target}|{datetime.date.today()}|{versions}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def _response(status, body=b"", headers=None, keep_alive=True):
+    status = HTTPStatus(status)
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}"]
+    headers = dict(headers or {})
+    headers["Content-Length"] = str(len(body))
+    headers["Connection"] = "keep-alive" if keep_alive else "close"
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+def _json_body(data):
+    # Strict JSON: NaN / Infinity would break most clients
+    return json.dumps(json_safe(data), ensure_ascii=False, allow_nan=False).encode(
+        "utf-8"
+    )
+
+
+async def handle_request(method, target, headers):
+    """Returns (status, body, headers) for one request."""
+    loop = asyncio.get_running_loop()
+    if method != "GET":
+        error = _json_body({"error": "Only GET is supported."})
+        return HTTPStatus.METHOD_NOT_ALLOWED, error, {}
+
+    url = urlsplit(target)
+    params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+    try:
+        handler, args, portfolios = route(url.path, params)
+        etag = await loop.run_in_executor(executor, compute_etag, target, portfolios)
+        if headers.get("if-none-match") == etag:
+            return HTTPStatus.NOT_MODIFIED, b"", {"ETag": etag}
+        data = await loop.run_in_executor(executor, handler, *args)
+    except ApiError as e:
+        return e.status, _json_body({"error": str(e)}), {}
+
+    return (
+        HTTPStatus.OK,
+        _json_body(data),
+        {"ETag": etag, "Content-Type": "application/json; charset=utf-8"},
+    )
+
+
+async def serve_client(reader, writer):
+    """Serves HTTP/1.1 requests of one connection until it is closed."""
+    try:
+        while True:
+            try:
+                request_line = await asyncio.wait_for(
+                    reader.readline(), KEEP_ALIVE_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                break
+            if not request_line.strip():
+                break
+            try:
+                method, target, version = request_line.decode("latin-1").split()
+            except ValueError:
+                writer.write(_response(HTTPStatus.BAD_REQUEST, keep_alive=False))
+                break
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            keep_alive = version == "HTTP/1.1" and (
+                headers.get("connection", "").lower() != "close"
+            )
+            try:
+                status, body, response_headers = await handle_request(
+                    method, target, headers
+                )
+            except Exception as e:  # never let one request kill the server
+                print(f"❌ {method} {target} failed: {e}")
+                status, body, response_headers = (
+                    HTTPStatus.INTERNAL_SERVER_ERROR,
+                    _json_body({"error": "Internal server error."}),
+                    {},
+                )
+            writer.write(_response(status, body, response_headers, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def main(host=HOST, port=PORT):
+    await asyncio.get_running_loop().run_in_executor(executor, ensure_db)
+    server = await asyncio.start_server(serve_client, host, port)
+    print(f"✅ Serving the investment API on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve analysis results as JSON.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+    asyncio.run(main(args.host, args.port))
@@ -1,21 +1,32 @@
+import importlib
+
 import streamlit as st
-from app_pages.analysis import show_analysis
-from app_pages.add_data import add_data
-from app_pages.delete_data import delete_data
-from app_pages.visual_analysis import show_visual_analysis
+from database import ensure_db, list_portfolios
+
+# Page label -> (module, function). Modules are imported only when their page
+# is selected, so a run does not pay for the dependencies of the other pages.
+PAGES = {
+    "📊 Analysis": ("app_pages.analysis", "show_analysis"),
+    "📈 Visual Analysis": ("app_pages.visual_analysis", "show_visual_analysis"),
+    "🔮 What-If": ("app_pages.what_if", "show_what_if"),
+    "💸 Cash Flows": ("app_pages.cash_flows", "show_cash_flows"),
+    "➕ Add Data": ("app_pages.add_data", "add_data"),
+    "🗑️ Delete Data": ("app_pages.delete_data", "delete_data"),
+}
+
+# Creates the engine and migrates the database once per process
+ensure_db()
 
 # Sidebar navigation
 st.sidebar.title("📂 Navigation")
-page = st.sidebar.radio(
-    "Go to:", ["📊 Analysis", "📈 Visual Analysis", "➕ Add Data", "🗑️ Delete Data"]
-)
+
+# Portfolio selection (all pages work on the selected portfolio)
+selected_portfolio = st.sidebar.selectbox("Portfolio:", list_portfolios())
+new_portfolio = st.sidebar.text_input("Or create a new portfolio:").strip()
+st.session_state.portfolio = new_portfolio or selected_portfolio
+
+page = st.sidebar.radio("Go to:", list(PAGES))
 
 # Show the selected page
-if page == "📊 Analysis":
-    show_analysis()
-elif page == "📈 Visual Analysis":
-    show_visual_analysis()
-elif page == "➕ Add Data":
-    add_data()
-elif page == "🗑️ Delete Data":
-    delete_data()
+module_name, function_name = PAGES[page]
+getattr(importlib.import_module(module_name), function_name)()
@@ -1,14 +1,25 @@
 import streamlit as st
 import datetime
-import os
+import pandas as pd
+import archive
 from io import StringIO
-from ingest_data import parse_and_save_asset, parse_and_save_funds
+from analyze import category_label
+from database import DEFAULT_PORTFOLIO, list_asset_categories
+from ingest_data import (
+    category_name,
+    parse_and_save_asset,
+    parse_and_save_funds,
+    parse_assets,
+    parse_funds,
+)
+from validation import load_thresholds, validate_day
 
 
 def add_data():
+    portfolio = st.session_state.get("portfolio", DEFAULT_PORTFOLIO)
     st.title("➕ Add Data")
+    st.caption(f"Portfolio: {portfolio}")
     upload_date = st.date_input("Select data date:", datetime.date.today(), key="date")
-    folder_name = upload_date.strftime("%Y-%m")  # eg: 2025-10
     display_date = upload_date.strftime("%B %d, %Y")  # eg: October 14, 2025
     col1, col2 = st.columns(2)
     with col1:
@@ -27,50 +38,91 @@ def add_data():
         # --- Add Other Assets ---
         st.header("💰 Add Other Assets")
 
-        metal = st.number_input("Precious Metals (TL)", min_value=0.0, step=1.0)
-        crypto = st.number_input("Crypto (TL)", min_value=0.0, step=1.0)
-        physical_gold = st.number_input("Physical Gold (TL)", min_value=0.0, step=1.0)
+        asset_values = {
+            category: st.number_input(
+                f"{category_label(category)} (TL)", min_value=0.0, step=1.0
+            )
+            for category in list_asset_categories(portfolio)
+        }
+
+        # New asset types are just new categories, no schema change needed
+        new_category = category_name(st.text_input("New asset category (optional):"))
+        if new_category:
+            asset_values[new_category] = st.number_input(
+                f"{category_label(new_category)} (TL)", min_value=0.0, step=1.0
+            )
+
+    override = st.checkbox(
+        "Save even if the data-quality checks find blocking issues",
+        help="Use this when a large change is real, e.g. a big purchase or sale.",
+    )
 
     if st.button("Add All Data"):
         # Is fund data provided either via file or text input?
         has_fund_data = uploaded_fund_file is not None or fund_text_input.strip() != ""
 
         # Are any asset values provided?
-        has_asset_data = any([metal, crypto, physical_gold])
+        has_asset_data = any(asset_values.values())
 
         if not has_fund_data:
             st.warning("⚠️ Please upload or paste fund data.")
         elif not has_asset_data:
             st.warning("⚠️ Please fill in all asset values.")
         else:
-            fund_dir = os.path.join("data_funds", folder_name)
-            asset_dir = os.path.join("data_assets", folder_name)
-            os.makedirs(fund_dir, exist_ok=True)
-            os.makedirs(asset_dir, exist_ok=True)
-            # === Save Funds ===
-            fund_file_path = os.path.join(fund_dir, f"{upload_date}.txt")
             if uploaded_fund_file is not None:
-                fund_bytes = uploaded_fund_file.getvalue()
-                fund_str = fund_bytes.decode("utf-8")
-                parse_and_save_funds(StringIO(fund_str), upload_date)
-                with open(fund_file_path, "wb") as f:
-                    f.write(fund_bytes)
+                fund_str = uploaded_fund_file.getvalue().decode("utf-8")
             else:
-                parse_and_save_funds(StringIO(fund_text_input), upload_date)
-                with open(fund_file_path, "w", encoding="utf-8") as f:
-                    f.write(fund_text_input)
+                fund_str = fund_text_input
+            asset_str = "\t".join(asset_values) + "\n" + "\t".join(
+                str(value) for value in asset_values.values()
+            )
 
-            # === Save Assets ===
-            asset_file_path = os.path.join(asset_dir, f"{upload_date}.txt")
-            parse_and_save_asset(
-                StringIO(
-                    f"precious_metals\tcrypto\tphysical_gold\n{metal}\t{crypto}\t{physical_gold}"
-                ),
-                upload_date,
+            funds = parse_funds(StringIO(fund_str))
+            assets = parse_assets(StringIO(asset_str))
+            if funds is None:
+                st.error(
+                    "❌ Fund data has a wrong format: expected fund names and "
+                    "values on two tab-separated lines of the same length."
+                )
+                return
+
+            # === Data-quality checks against the stored history ===
+            thresholds = load_thresholds()
+            issues = pd.concat(
+                [
+                    validate_day(
+                        "fund",
+                        upload_date,
+                        {code: value for code, _, value in funds},
+                        portfolio,
+                        thresholds,
+                    ),
+                    validate_day(
+                        "asset", upload_date, dict(assets), portfolio, thresholds
+                    ),
+                ],
+                ignore_index=True,
             )
-            with open(asset_file_path, "w", encoding="utf-8") as f:
-                f.write("precious_metals\tcrypto\tphysical_gold\n")
-                f.write(f"{metal}\t{crypto}\t{physical_gold}")
+            blocked = (issues["severity"] == "block").any()
+            for issue in issues.itertuples():
+                if issue.severity == "block":
+                    st.error(f"❌ {issue.message}")
+                else:
+                    st.warning(f"⚠️ {issue.message}")
+            if blocked and not override:
+                st.error(
+                    "Nothing was saved. Fix the data, or tick the checkbox above "
+                    "if the changes are real."
+                )
+                return
+
+            # === Save Funds ===
+            parse_and_save_funds(StringIO(fund_str), upload_date, portfolio)
+            archive.store_raw("funds", upload_date, fund_str, portfolio)
+
+            # === Save Assets ===
+            parse_and_save_asset(StringIO(asset_str), upload_date, portfolio)
+            archive.store_raw("assets", upload_date, asset_str, portfolio)
 
             st.success(
                 f"✅ Fund and asset data for {upload_date} uploaded successfully!"
@@ -1,12 +1,79 @@
 import streamlit as st
 import datetime
+import os
 import pandas as pd
-from analyze import get_all_funds_changes, get_all_assets_changes, get_top_bottom_funds
+from analyze import (
+    category_label,
+    get_all_funds_changes,
+    get_all_assets_changes,
+    get_portfolios_overview,
+    get_top_bottom_funds,
+    value_changes,
+)
+from database import DEFAULT_PORTFOLIO
+from export import TABLES, available_formats, export_changes
+from returns import get_returns
 from summary_calculator import SummaryCalculator
 
+# Larger exports are only written to disk, reading them back for a download
+# button would load the whole file into the app's memory
+MAX_DOWNLOAD_BYTES = 50 * 1024 * 1024
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+# Wide tables initially show only this many series
+DEFAULT_VISIBLE_COLUMNS = 10
+
+
+def show_paginated_table(amounts, pcts, key):
+    """
+    Shows a daily table with a TL and a % column per series.
+    The frames stay numeric and are formatted by the browser; only the
+    selected columns of the current page are sliced and sent.
+    """
+    series = list(amounts.columns)
+    col_columns, col_size, col_page = st.columns([4, 1, 1])
+    with col_columns:
+        selected = st.multiselect(
+            "Columns:",
+            series,
+            default=series[:DEFAULT_VISIBLE_COLUMNS],
+            key=f"{key}_columns",
+        )
+    with col_size:
+        page_size = st.selectbox("Rows per page:", PAGE_SIZES, key=f"{key}_size")
+    pages = max(1, -(-len(amounts) // page_size))
+    # Start on the most recent page and stay in range when the page size grows
+    if st.session_state.get(f"{key}_page", pages) > pages:
+        st.session_state[f"{key}_page"] = pages
+    st.session_state.setdefault(f"{key}_page", pages)
+    with col_page:
+        page = st.number_input(f"Page (of {pages}):", 1, pages, key=f"{key}_page")
+    if not selected:
+        st.info("Select at least one column.")
+        return
+
+    rows = slice((page - 1) * page_size, page * page_size)
+    table = {}
+    for name in selected:
+        table[f"{name} (TL)"] = amounts[name].iloc[rows]
+        table[f"{name} (%)"] = pcts[name].iloc[rows]
+    st.dataframe(
+        pd.DataFrame(table),
+        use_container_width=True,
+        column_config={
+            column: st.column_config.NumberColumn(
+                format="%.2f TL" if column.endswith("(TL)") else "%.2f%%"
+            )
+            for column in table
+        },
+    )
+
 
 def show_analysis():
+    portfolio = st.session_state.get("portfolio", DEFAULT_PORTFOLIO)
     st.title("📊 Portfolio Analysis")
+    st.caption(f"Portfolio: {portfolio}")
 
     # === Date Selection + Summary ===
     col_date, col_summary = st.columns([1.5, 2.5])
@@ -17,7 +84,12 @@ def show_analysis():
             key="start_analysis",
         )
         end_date = st.date_input("End Date:", datetime.date.today(), key="end_analysis")
-        show_btn = st.button("Show Analysis")
+        # The analysis stays open while its tables are paged or filtered,
+        # until the date range or portfolio changes
+        selection = (portfolio, start_date, end_date)
+        if st.button("Show Analysis"):
+            st.session_state.analysis_shown = selection
+        show_btn = st.session_state.get("analysis_shown") == selection
 
     with col_summary:
         st.markdown("#### 📘 General Summary")
@@ -29,15 +101,18 @@ def show_analysis():
                 return
 
             # === Get fund + asset data ===
-            fund_result = get_all_funds_changes(start_date, end_date)
-            asset_result = get_all_assets_changes(start_date, end_date)
+            fund_result = get_all_funds_changes(start_date, end_date, portfolio=portfolio)
+            asset_result = get_all_assets_changes(start_date, end_date, portfolio=portfolio)
 
             if fund_result is None or asset_result is None:
                 st.warning("No data found for the selected period.")
                 return
 
-            # === Get total summary (fund + assets) ===
-            summary = SummaryCalculator.from_portfolio(fund_result, asset_result)
+            # === Summaries of the portfolio, funds, assets and every single fund ===
+            summaries = SummaryCalculator.from_results(
+                fund_result, asset_result, include_funds=True
+            )
+            summary = summaries.loc["total_portfolio"]
             col1, col2 = st.columns(2)
             with col1:
                 st.metric("Start Value (TL)", f"{summary['start_value']:,.2f}")
@@ -50,138 +125,78 @@ def show_analysis():
                 f"{summary['total_change_pct']:.4f}%",
             )
 
+            # Returns net of the deposits and withdrawals on the Cash Flows page
+            returns = get_returns(start_date, end_date, portfolio=portfolio)
+            if returns is not None:
+                total = returns.iloc[0]
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.metric("Time-Weighted Return", f"{total['twr_pct']:.4f}%")
+                with col2:
+                    st.metric("Money-Weighted Return", f"{total['mwr_pct']:.4f}%")
+
     # === Analysis Sections ===
     if show_btn:
-        if start_date > end_date:
-            st.error("Start date cannot be after end date.")
-            return
+        # --- Funds and Asset Category Summaries ---
+        sections = [("Funds", summaries.loc["funds"])] + [
+            (category_label(category), summaries.loc[category])
+            for category in asset_result["pivot"].columns
+        ]
+        columns = st.columns(2)
+        for i, (title, section_summary) in enumerate(sections):
+            with columns[i % 2]:
+                st.subheader(f"📅 {title}")
+                col11, col22 = st.columns(2)
+                with col11:
+                    st.metric("Start Value (TL)", f"{section_summary['start_value']:,.2f}")
+                with col22:
+                    st.metric("End Value (TL)", f"{section_summary['end_value']:,.2f}")
 
-        fund_result = get_all_funds_changes(start_date, end_date)
-        asset_result = get_all_assets_changes(start_date, end_date)
+                st.metric(
+                    "Total Change",
+                    f"{section_summary['total_change_tl']:,.2f} TL",
+                    f"{section_summary['total_change_pct']:.4f}%",
+                )
 
-        if fund_result is None or asset_result is None:
-            st.warning("No data available for this range.")
-            return
-        col1, col2 = st.columns(2)
-        with col1:
-            # --- Funds Summary ---
-            st.subheader("📅 Funds")
-            funds_summary = SummaryCalculator.from_fund(fund_result)
-            col11, col22 = st.columns(2)
-            with col11:
-                st.metric("Start Value (TL)", f"{funds_summary['start_value']:,.2f}")
-            with col22:
-                st.metric("End Value (TL)", f"{funds_summary['end_value']:,.2f}")
-
-            st.metric(
-                "Total Change",
-                f"{funds_summary['total_change_tl']:,.2f} TL",
-                f"{funds_summary['total_change_pct']:.4f}%",
+        # --- Per-Fund Summary ---
+        with st.expander("📋 Per-Fund Summary (Overall Period)"):
+            st.dataframe(
+                summaries.loc[fund_result["pivot"].columns]
+                .rename(
+                    columns={
+                        "start_value": "Start Value (TL)",
+                        "end_value": "End Value (TL)",
+                        "total_change_tl": "TL Change",
+                        "total_change_pct": "% Change",
+                    }
+                )
+                .round(2),
+                use_container_width=True,
             )
-        with col2:
-            # --- Crypto Summary ---
-            st.subheader("📅 Crypto")
-            crypto_summary = SummaryCalculator.from_asset(asset_result, "crypto_tl")
-            col11, col22 = st.columns(2)
-            with col11:
-                st.metric("Start Value (TL)", f"{crypto_summary['start_value']:,.2f}")
-            with col22:
-                st.metric("End Value (TL)", f"{crypto_summary['end_value']:,.2f}")
 
-            st.metric(
-                "Total Change",
-                f"{crypto_summary['total_change_tl']:,.2f} TL",
-                f"{crypto_summary['total_change_pct']:.4f}%",
-            )
+        # --- Daily Tables ---
+        daily_total = SummaryCalculator.aligned_frame(fund_result, asset_result)
+        daily_total = daily_total.rename(
+            columns=lambda column: category_label(column.replace("_portfolio", ""))
+        )
+        total_pct = value_changes(daily_total)[1]
 
-        with col1:
-            # --- Precious Metals Summary ---
-            st.subheader("📅 Precious Metals")
-            metal_summary = SummaryCalculator.from_asset(
-                asset_result, "precious_metals_tl"
-            )
-            col11, col22 = st.columns(2)
-            with col11:
-                st.metric("Start Value (TL)", f"{metal_summary['start_value']:,.2f}")
-            with col22:
-                st.metric("End Value (TL)", f"{metal_summary['end_value']:,.2f}")
+        st.subheader("📅 Daily Total Values (Funds + Assets)")
+        show_paginated_table(daily_total, total_pct, "daily_total")
 
-            st.metric(
-                "Total Change",
-                f"{metal_summary['total_change_tl']:,.2f} TL",
-                f"{metal_summary['total_change_pct']:.4f}%",
-            )
-        with col2:
-            # --- Physical Gold Summary ---
-            st.subheader("📅 Physical Gold")
-            gold_summary = SummaryCalculator.from_asset(
-                asset_result, "physical_gold_tl"
-            )
-            col11, col22 = st.columns(2)
-            with col11:
-                st.metric("Start Value (TL)", f"{gold_summary['start_value']:,.2f}")
-            with col22:
-                st.metric("End Value (TL)", f"{gold_summary['end_value']:,.2f}")
+        st.subheader("📈 Daily Fund Changes")
+        show_paginated_table(
+            fund_result["fund_changes"],
+            fund_result["fund_pct_changes"],
+            "daily_funds",
+        )
 
-            st.metric(
-                "Total Change",
-                f"{gold_summary['total_change_tl']:,.2f} TL",
-                f"{gold_summary['total_change_pct']:.4f}%",
-            )
-        # --- Daily Total Values ---
-        # st.subheader("📅 Daily Total Values (Funds + Assets)")
-
-        # Merge indexes to ensure all dates are included
-        # all_dates = fund_result["total_funds"].index.union(asset_result["total_assets"].index)
-
-        # # Fill missing dates with 0
-        # total_funds = fund_result["total_funds"].reindex(all_dates, fill_value=0)
-        # total_assets = asset_result["total_assets"].reindex(all_dates, fill_value=0)
-        # total_funds_pct = fund_result["total_pct_change"].reindex(all_dates, fill_value=0)
-        # total_assets_pct = asset_result["total_pct_change"].reindex(all_dates, fill_value=0)
-        # total_sum = total_funds + total_assets
-        # total_sum_pct_change = total_sum.pct_change().fillna(0)
-
-        # df_total = pd.DataFrame({
-        #     "Date": all_dates,
-        #     "TOTAL (TL)": total_sum.round(2).astype(str) + " TL (" + total_sum_pct_change.round(2).astype(str) + "%)",
-        #     "Total Funds (TL)": total_funds.round(2).astype(str) + " TL (" + total_funds_pct.round(2).astype(str) + "%)",
-        #     "Total Assets (TL)": total_assets.round(2).astype(str) + " TL (" + total_assets_pct.round(2).astype(str) + "%)",
-        #     "Precious Metals (TL)": asset_result["pivot"]["precious_metals_tl"].reindex(all_dates, fill_value=0).round(2).astype(str) + " TL (" +
-        #                             asset_result["asset_pct_changes"]["precious_metals_tl"].reindex(all_dates, fill_value=0).round(2).astype(str) + "%)",
-        #     "Crypto (TL)": asset_result["pivot"]["crypto_tl"].reindex(all_dates, fill_value=0).round(2).astype(str) + " TL (" +
-        #                 asset_result["asset_pct_changes"]["crypto_tl"].reindex(all_dates, fill_value=0).round(2).astype(str) + "%)",
-        #     "Physical Gold (TL)": asset_result["pivot"]["physical_gold_tl"].reindex(all_dates, fill_value=0).round(2).astype(str) + " TL (" +
-        #                         asset_result["asset_pct_changes"]["physical_gold_tl"].reindex(all_dates, fill_value=0).round(2).astype(str) + "%)",
-        # }).set_index("Date")
-
-        # st.dataframe(df_total.round(2), use_container_width=True)
-
-        # --- Daily Fund Changes ---
-        # st.subheader("📈 Daily Fund Changes")
-        # df_fund_changes = fund_result["fund_changes"].round(2)
-        # df_fund_pct = fund_result["fund_pct_changes"].round(2)
-
-        # df_display_fund = pd.DataFrame(index=df_fund_changes.index)
-        # for col in df_fund_changes.columns:
-        #     df_display_fund[col] = (
-        #         df_fund_changes[col].astype(str) + " TL (" + df_fund_pct[col].astype(str) + "%)"
-        #     )
-
-        # st.dataframe(df_display_fund, use_container_width=True)
-
-        # --- Daily Asset Changes ---
-        # st.subheader("💰 Daily Asset Changes")
-        # df_asset_changes = asset_result["asset_changes"].round(2)
-        # df_asset_pct = asset_result["asset_pct_changes"].round(2)
-
-        # df_display_asset = pd.DataFrame(index=df_asset_changes.index)
-        # for col in df_asset_changes.columns:
-        #     df_display_asset[col] = (
-        #         df_asset_changes[col].astype(str) + " TL (" + df_asset_pct[col].astype(str) + "%)"
-        #     )
-
-        # st.dataframe(df_display_asset, use_container_width=True)
+        st.subheader("💰 Daily Asset Changes")
+        show_paginated_table(
+            asset_result["asset_changes"].rename(columns=category_label),
+            asset_result["asset_pct_changes"].rename(columns=category_label),
+            "daily_assets",
+        )
 
         # --- Top / Bottom Funds ---
         st.subheader("🏆 Top / Bottom Funds (Overall Period)")
@@ -215,3 +230,61 @@ def show_analysis():
                 .rename(columns={"index": "Fund Code", 0: "TL Change"})
                 .round(2)
             )
+
+        # --- All Portfolios ---
+        overview = get_portfolios_overview(start_date, end_date)
+        if overview is not None and len(overview) > 1:
+            st.subheader("🗂️ All Portfolios (Overall Period)")
+            st.dataframe(
+                overview.rename(
+                    columns={
+                        "start_value": "Start Value (TL)",
+                        "end_value": "End Value (TL)",
+                        "total_change_tl": "TL Change",
+                        "total_change_pct": "% Change",
+                    }
+                ).round(2),
+                use_container_width=True,
+            )
+
+    # === Export ===
+    with st.expander("📤 Export Daily Values and Changes"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            kind = st.selectbox(
+                "Data:", ["fund", "asset"], format_func=lambda k: f"{k.title()}s"
+            )
+        with col2:
+            tables = st.multiselect("Tables:", TABLES, default=list(TABLES))
+        with col3:
+            fmt = st.selectbox("Format:", available_formats())
+            compress = st.checkbox("Compress (gzip)", disabled=fmt != "csv")
+
+        if st.button("Export") and tables:
+            with st.spinner("Exporting..."):
+                try:
+                    paths = export_changes(
+                        kind,
+                        start_date,
+                        end_date,
+                        portfolio=portfolio,
+                        tables=tables,
+                        fmt=fmt,
+                        compress=compress,
+                    )
+                except RuntimeError as e:
+                    st.error(str(e))
+                    paths = []
+            if not paths:
+                st.warning("No data found for the selected period.")
+            for path in paths:
+                if os.path.getsize(path) > MAX_DOWNLOAD_BYTES:
+                    st.success(f"✅ Exported to {path}")
+                    continue
+                with open(path, "rb") as f:
+                    st.download_button(
+                        f"⬇️ {os.path.basename(path)}",
+                        f,
+                        file_name=os.path.basename(path),
+                        key=path,
+                    )
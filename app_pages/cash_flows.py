@@ -0,0 +1,129 @@
+import streamlit as st
+import datetime
+from analyze import category_label, list_series
+from database import DEFAULT_PORTFOLIO
+from returns import add_cash_flow, delete_cash_flow, get_returns, list_cash_flows
+
+KIND_LABELS = {"Fund": "fund", "Asset": "asset"}
+
+
+def show_cash_flows():
+    portfolio = st.session_state.get("portfolio", DEFAULT_PORTFOLIO)
+    st.title("💸 Cash Flows & Returns")
+    st.caption(f"Portfolio: {portfolio}")
+    st.markdown(
+        "Record the money you put into or take out of a fund or asset, so "
+        "that returns are not inflated by deposits or lowered by withdrawals."
+    )
+
+    # --- Record a flow ---
+    st.subheader("➕ Record a Cash Flow")
+    col1, col2 = st.columns(2)
+    with col1:
+        flow_date = st.date_input("Date:", datetime.date.today(), key="flow_date")
+        kind = KIND_LABELS[st.radio("Type:", list(KIND_LABELS), horizontal=True)]
+        series = list_series(kind, datetime.date.min, flow_date, portfolio=portfolio)
+        if not series:
+            st.info(f"ℹ️ No {kind} data found up to {flow_date}.")
+            selected = None
+        else:
+            selected = st.selectbox(
+                "Fund:" if kind == "fund" else "Asset category:",
+                series,
+                format_func=category_label if kind == "asset" else str,
+            )
+    with col2:
+        direction = st.radio("Direction:", ["Deposit", "Withdrawal"], horizontal=True)
+        amount = st.number_input("Amount (TL):", min_value=0.0, step=100.0)
+        note = st.text_input("Note (optional):")
+
+    if st.button("Save Cash Flow", disabled=selected is None or amount <= 0):
+        signed = amount if direction == "Deposit" else -amount
+        add_cash_flow(
+            flow_date, kind, selected, signed, portfolio=portfolio, note=note or None
+        )
+        st.success(f"✅ {direction} of {amount:,.2f} TL saved for {selected}.")
+
+    # --- Recorded flows ---
+    st.subheader("📒 Recorded Cash Flows")
+    flows = list_cash_flows(portfolio)
+    if flows.empty:
+        st.info("ℹ️ No cash flows recorded yet.")
+    else:
+        st.dataframe(
+            flows,
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "amount": st.column_config.NumberColumn("amount", format="%.2f TL")
+            },
+        )
+        col_id, col_btn = st.columns([1, 2])
+        with col_id:
+            flow_id = st.selectbox("Cash flow to delete (id):", flows["id"])
+        with col_btn:
+            st.write("")
+            if st.button(f"🗑️ Delete Cash Flow {flow_id}"):
+                delete_cash_flow(int(flow_id), portfolio=portfolio)
+                st.success(f"✅ Deleted cash flow {flow_id}.")
+                st.experimental_rerun()
+
+    # --- Returns ---
+    st.subheader("📈 Cash-Flow Adjusted Returns")
+    col_start, col_end = st.columns(2)
+    with col_start:
+        start_date = st.date_input(
+            "Start Date:",
+            datetime.date.today() - datetime.timedelta(days=365),
+            key="start_returns",
+        )
+    with col_end:
+        end_date = st.date_input("End Date:", datetime.date.today(), key="end_returns")
+    if start_date > end_date:
+        st.error("Start date cannot be after end date.")
+        return
+
+    returns = get_returns(start_date, end_date, portfolio=portfolio)
+    if returns is None:
+        st.warning("No data found for the selected period.")
+        return
+
+    total = returns.iloc[0]
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Time-Weighted Return", f"{total['twr_pct']:.4f}%")
+    with col2:
+        st.metric(
+            "Money-Weighted Return",
+            f"{total['mwr_pct']:.4f}%",
+            f"{total['mwr_annual_pct']:.2f}% per year",
+        )
+    with col3:
+        st.metric(
+            "Gain (excluding flows)",
+            f"{total['gain_tl']:,.2f} TL",
+            f"Net flows: {total['net_flows']:,.2f} TL",
+            delta_color="off",
+        )
+    st.caption(
+        "The time-weighted return measures the investments regardless of when "
+        "money was added or withdrawn; the money-weighted return is the yield "
+        "of your own deposits and withdrawals."
+    )
+
+    money = st.column_config.NumberColumn(format="%.2f")
+    percent = st.column_config.NumberColumn(format="%.4f%%")
+    st.dataframe(
+        returns.iloc[1:],
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "start_value": money,
+            "net_flows": money,
+            "end_value": money,
+            "gain_tl": money,
+            "twr_pct": percent,
+            "mwr_pct": percent,
+            "mwr_annual_pct": percent,
+        },
+    )
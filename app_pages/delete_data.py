@@ -2,22 +2,53 @@ import streamlit as st
 import os
 import calendar
 import datetime
-from database import SessionLocal, FundValue, AssetValue
+import archive
+from database import (
+    DEFAULT_PORTFOLIO,
+    SessionLocal,
+    FundValue,
+    AssetValue,
+    bump_data_version,
+)
+from returns import refresh_growth_index
+from rollups import refresh_rollups
 
+LEGACY_DIRS = ("data_funds", "data_assets")
 
-def get_existing_months(base_dirs=("data_funds", "data_assets")):
+
+def get_existing_months(portfolio=DEFAULT_PORTFOLIO, base_dirs=LEGACY_DIRS):
     """Returns a sorted list of existing month folders like ['2025-09', '2025-10']"""
     months = set()
-    for base_dir in base_dirs:
-        if not os.path.exists(base_dir):
-            continue
-        for folder in os.listdir(base_dir):
-            folder_path = os.path.join(base_dir, folder)
-            if os.path.isdir(folder_path) and "-" in folder:
-                months.add(folder)
+    # Legacy plain-text folders only hold data of the default portfolio
+    if portfolio == DEFAULT_PORTFOLIO:
+        for base_dir in base_dirs:
+            if not os.path.exists(base_dir):
+                continue
+            for folder in os.listdir(base_dir):
+                folder_path = os.path.join(base_dir, folder)
+                if os.path.isdir(folder_path) and "-" in folder:
+                    months.add(folder)
+    for kind in archive.KINDS:
+        for date in archive.archived_dates(kind, portfolio):
+            months.add(date.strftime("%Y-%m"))
     return sorted(months)
 
 
+def get_existing_days(month_folder, portfolio=DEFAULT_PORTFOLIO):
+    """Returns a sorted list of days like ['2025-10-01', ...] stored for a month."""
+    days = set()
+    if portfolio == DEFAULT_PORTFOLIO:
+        for base_dir in LEGACY_DIRS:
+            month_dir = os.path.join(base_dir, month_folder)
+            if os.path.exists(month_dir):
+                days.update(f.replace(".txt", "") for f in os.listdir(month_dir))
+    for kind in archive.KINDS:
+        for date in archive.archived_dates(kind, portfolio):
+            if date.strftime("%Y-%m") == month_folder:
+                days.add(date.isoformat())
+    return sorted(days)
+
+
 def format_month_label(month_folder):
     """For UI: '2025-10' → 'October 2025'"""
     try:
@@ -28,32 +59,65 @@ def format_month_label(month_folder):
         return month_folder
 
 
-def delete_entire_month(label, year, month, month_folder):
-    """Deletes all data and files for a given month."""
+def delete_date_range(start_date, end_date, portfolio=DEFAULT_PORTFOLIO):
+    """
+    Deletes all database rows and raw files of a portfolio between two dates.
+    Returns the number of deleted (fund rows, asset rows).
+    """
     session = SessionLocal()
-
-    start_date = datetime.date(year, month, 1)
-    end_day = calendar.monthrange(year, month)[1]
-    end_date = datetime.date(year, month, end_day)
-
     deleted_funds = (
         session.query(FundValue)
-        .filter(FundValue.date.between(start_date, end_date))
+        .filter(
+            FundValue.portfolio == portfolio,
+            FundValue.date.between(start_date, end_date),
+        )
         .delete()
     )
     deleted_assets = (
         session.query(AssetValue)
-        .filter(AssetValue.date.between(start_date, end_date))
+        .filter(
+            AssetValue.portfolio == portfolio,
+            AssetValue.date.between(start_date, end_date),
+        )
         .delete()
     )
+    bump_data_version(session, portfolio)
     session.commit()
     session.close()
+    refresh_rollups(start_date, end_date, portfolio)
+    refresh_growth_index(start_date, portfolio)
+
+    # Delete raw files
+    for kind in archive.KINDS:
+        for date in archive.archived_dates(kind, portfolio):
+            if start_date <= date <= end_date:
+                archive.remove_raw(kind, date, portfolio)
+    archive.collect_garbage()
+
+    if portfolio == DEFAULT_PORTFOLIO:
+        date = start_date
+        while date <= end_date:
+            for base_dir in LEGACY_DIRS:
+                file_path = os.path.join(base_dir, date.strftime("%Y-%m"), f"{date}.txt")
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+            date += datetime.timedelta(days=1)
+
+    return deleted_funds, deleted_assets
+
+
+def delete_entire_month(label, year, month, month_folder, portfolio=DEFAULT_PORTFOLIO):
+    """Deletes all data and files for a given month."""
+    start_date = datetime.date(year, month, 1)
+    end_day = calendar.monthrange(year, month)[1]
+    end_date = datetime.date(year, month, end_day)
+
+    deleted_funds, deleted_assets = delete_date_range(start_date, end_date, portfolio)
 
-    # Delete files and folders
-    for folder in [os.path.join("data_funds", month_folder), os.path.join("data_assets", month_folder)]:
-        if os.path.exists(folder):
-            for f in os.listdir(folder):
-                os.remove(os.path.join(folder, f))
+    # Delete empty legacy folders
+    for base_dir in LEGACY_DIRS:
+        folder = os.path.join(base_dir, month_folder)
+        if os.path.exists(folder) and not os.listdir(folder):
             os.rmdir(folder)
 
     st.success(
@@ -63,9 +127,11 @@ def delete_entire_month(label, year, month, month_folder):
 
 
 def delete_data():
+    portfolio = st.session_state.get("portfolio", DEFAULT_PORTFOLIO)
     st.title("🗑️ Delete Data")
+    st.caption(f"Portfolio: {portfolio}")
 
-    months = get_existing_months()
+    months = get_existing_months(portfolio)
     if not months:
         st.info("ℹ️ No data folders found yet.")
         return
@@ -112,17 +178,13 @@ def delete_data():
             st.warning(f"⚠️ Are you sure you want to delete ALL data for {label}? This action cannot be undone.")
             confirm_month = st.checkbox("Yes, I want to permanently delete this month's data.", key=f"chk_month_{selected_month_folder}")
             if confirm_month and st.button("🚨 Confirm Delete Month", key=f"confirm_btn_{selected_month_folder}"):
-                delete_entire_month(label, year, month, selected_month_folder)
+                delete_entire_month(label, year, month, selected_month_folder, portfolio)
                 st.session_state.confirm_delete_month = False
         
         # Specific day delete
-        funds_month_dir = os.path.join("data_funds", selected_month_folder)
-        assets_month_dir = os.path.join("data_assets", selected_month_folder)
-        fund_files = sorted(os.listdir(funds_month_dir)) if os.path.exists(funds_month_dir) else []
-        asset_files = sorted(os.listdir(assets_month_dir)) if os.path.exists(assets_month_dir) else []
+        available_days = get_existing_days(selected_month_folder, portfolio)
 
-        if fund_files or asset_files:
-            available_days = sorted({f.replace(".txt", "") for f in fund_files + asset_files})
+        if available_days:
             selected_day = st.selectbox("Select a date to delete:", available_days, key=f"day_{selected_month_folder}")
 
             if st.button(f"🗑️ Delete {selected_day} Data", key=f"del_day_{selected_month_folder}"):
@@ -133,16 +195,6 @@ def delete_data():
                 confirm_day = st.checkbox("Yes, permanently delete this day’s data.", key=f"chk_day_{selected_month_folder}_{selected_day}")
                 if confirm_day and st.button("🚨 Confirm Delete Day", key=f"confirm_day_btn_{selected_month_folder}_{selected_day}"):
                     date_obj = datetime.datetime.strptime(selected_day, "%Y-%m-%d").date()
-                    session = SessionLocal()
-                    deleted_funds = session.query(FundValue).filter(FundValue.date == date_obj).delete()
-                    deleted_assets = session.query(AssetValue).filter(AssetValue.date == date_obj).delete()
-                    session.commit()
-                    session.close()
-
-                    # Delete files
-                    for base_dir in ["data_funds", "data_assets"]:
-                        file_path = os.path.join(base_dir, selected_month_folder, f"{selected_day}.txt")
-                        if os.path.exists(file_path):
-                            os.remove(file_path)
+                    deleted_funds, deleted_assets = delete_date_range(date_obj, date_obj, portfolio)
 
                     st.success(f"✅ Deleted data for {selected_day} ({deleted_funds} fund rows, {deleted_assets} asset rows).")
\ No newline at end of file
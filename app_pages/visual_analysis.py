@@ -1,12 +1,15 @@
 # pages/Visual_Analysis.py
 import streamlit as st
-from analyze import get_all_assets_changes, get_all_funds_changes
+from analyze import category_label, get_all_assets_changes, get_all_funds_changes
 import datetime
 import plotly.express as px
+from correlation import get_fund_correlations
+from database import DEFAULT_PORTFOLIO
 
 
 def show_visual_analysis():
     st.set_page_config(page_title="Visual Analysis", layout="wide")
+    portfolio = st.session_state.get("portfolio", DEFAULT_PORTFOLIO)
 
     st.title("📊 Visual Analysis")
     st.markdown("Explore your portfolio trends and daily performance at a glance.")
@@ -25,8 +28,8 @@ def show_visual_analysis():
         st.stop()
 
     # --- Get data ---
-    fund_result = get_all_funds_changes(start_date, end_date)
-    asset_result = get_all_assets_changes(start_date, end_date)
+    fund_result = get_all_funds_changes(start_date, end_date, portfolio=portfolio)
+    asset_result = get_all_assets_changes(start_date, end_date, portfolio=portfolio)
     if not fund_result or not asset_result:
         st.warning("No data available for the selected date range.")
         st.stop()
@@ -78,83 +81,35 @@ def show_visual_analysis():
             height=450,
         )
         st.plotly_chart(fig_total, use_container_width=True)
-        
-        # --- 3 Daily Precious Metals Value ---
-        st.subheader("Daily Crypto Value")
-        st.caption("Shows how your crypto portfolio value evolved over time.")
 
-        total_df = asset_result["pivot"]["crypto_tl"].reset_index()
-        total_df.columns = ["Date", "Crypto Value (TL)"]
-        total_df["Crypto Value (TL)"] = total_df[
-            "Crypto Value (TL)"
-        ].fillna(0)
-
-        fig_total = px.line(
-            total_df,
-            x="Date",
-            y="Crypto Value (TL)",
-            title="Daily Crypto Value",
-            markers=True,
-        )
-        fig_total.update_layout(
-            xaxis_title="Date",
-            yaxis_title="Crypto Value (TL)",
-            title_x=0.5,
-            height=450,
-        )
-        st.plotly_chart(fig_total, use_container_width=True)
-
-    with col2:
-        # --- 4 Daily Precious Metals Value ---
-        st.subheader("Daily Precious Metals Value")
-        st.caption("Shows how your precious metals portfolio value evolved over time.")
-
-        total_df = asset_result["pivot"]["precious_metals_tl"].reset_index()
-        total_df.columns = ["Date", "Precious Metals Value (TL)"]
-        total_df["Precious Metals Value (TL)"] = total_df[
-            "Precious Metals Value (TL)"
-        ].fillna(0)
-
-        fig_total = px.line(
-            total_df,
-            x="Date",
-            y="Precious Metals Value (TL)",
-            title="Daily Precious Metals Value",
-            markers=True,
-        )
-        fig_total.update_layout(
-            xaxis_title="Date",
-            yaxis_title="Precious Metals Value (TL)",
-            title_x=0.5,
-            height=450,
-        )
-        st.plotly_chart(fig_total, use_container_width=True)
-
-        # --- 4 Daily Precious Metals Value ---
-        st.subheader("Daily Physical Gold Value")
-        st.caption("Shows how your physical gold portfolio value evolved over time.")
-
-        total_df = asset_result["pivot"]["physical_gold_tl"].reset_index()
-        total_df.columns = ["Date", "Physical Gold Value (TL)"]
-        total_df["Physical Gold Value (TL)"] = total_df[
-            "Physical Gold Value (TL)"
-        ].fillna(0)
-
-        fig_total = px.line(
-            total_df,
-            x="Date",
-            y="Physical Gold Value (TL)",
-            title="Daily Physical Gold Value",
-            markers=True,
-        )
-        fig_total.update_layout(
-            xaxis_title="Date",
-            yaxis_title="Physical Gold Value (TL)",
-            title_x=0.5,
-            height=450,
-        )
-        st.plotly_chart(fig_total, use_container_width=True)
-        
+    # --- 3 Daily Value of each Asset Category ---
+    categories = list(asset_result["pivot"].columns)
+    for i, category in enumerate(categories):
+        with (col1, col2)[i % 2]:
+            label = category_label(category)
+            st.subheader(f"Daily {label} Value")
+            st.caption(f"Shows how your {label.lower()} portfolio value evolved over time.")
+
+            total_df = asset_result["pivot"][category].reset_index()
+            total_df.columns = ["Date", f"{label} Value (TL)"]
+            total_df[f"{label} Value (TL)"] = total_df[f"{label} Value (TL)"].fillna(0)
+
+            fig_total = px.line(
+                total_df,
+                x="Date",
+                y=f"{label} Value (TL)",
+                title=f"Daily {label} Value",
+                markers=True,
+            )
+            fig_total.update_layout(
+                xaxis_title="Date",
+                yaxis_title=f"{label} Value (TL)",
+                title_x=0.5,
+                height=450,
+            )
+            st.plotly_chart(fig_total, use_container_width=True)
+
+    with (col1, col2)[len(categories) % 2]:
         # --- 4 Daily Percentage Change ---
         st.subheader("Daily Percentage Change of Total Portfolio")
         st.caption(
@@ -179,3 +134,73 @@ def show_visual_analysis():
         st.plotly_chart(fig_pct, use_container_width=True)
 
         st.markdown("✅ **Tip:** Green bars indicate gains, red bars indicate losses.")
+
+    # --- 5 Fund Correlation ---
+    st.subheader("Fund Correlation")
+    st.caption(
+        "Shows how the daily returns of your funds move together. "
+        "Low or negative correlations mean better diversification."
+    )
+    col_matrix, col_order, col_window = st.columns(3)
+    with col_matrix:
+        matrix = st.radio("Matrix:", ["Correlation", "Covariance"], horizontal=True)
+    with col_order:
+        ordering = st.selectbox(
+            "Order funds by:",
+            ["spectral", "none"],
+            format_func=lambda o: "Similarity" if o == "spectral" else "Fund code",
+        )
+    with col_window:
+        window = st.number_input(
+            "Rolling window (days, 0 = whole range):", min_value=0, value=0, step=5
+        )
+
+    correlations = get_fund_correlations(
+        start_date,
+        end_date,
+        portfolio=portfolio,
+        window=int(window) or None,
+        ordering=ordering,
+    )
+    if correlations is None:
+        st.info("Not enough daily fund returns in this range for a correlation.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Average Correlation", f"{correlations['average_correlation']:.2f}")
+    col2.metric(
+        "Diversification Ratio", f"{correlations['diversification_ratio']:.2f}"
+    )
+    col3.metric("Daily Returns Used", correlations["observations"])
+    if correlations["excluded"]:
+        st.caption(
+            "Not included (value did not change): "
+            + ", ".join(correlations["excluded"])
+        )
+
+    data = correlations[matrix.lower()]
+    fig_heatmap = px.imshow(
+        data,
+        color_continuous_scale="RdBu_r",
+        zmin=-1 if matrix == "Correlation" else None,
+        zmax=1 if matrix == "Correlation" else None,
+        aspect="auto",
+        title=f"{matrix} of Daily Fund Returns",
+    )
+    fig_heatmap.update_layout(
+        title_x=0.5, height=max(450, min(1200, 14 * len(data)))
+    )
+    st.plotly_chart(fig_heatmap, use_container_width=True)
+
+    rolling = correlations["rolling_average"]
+    if rolling is not None and not rolling.empty:
+        rolling_df = rolling.reset_index()
+        rolling_df.columns = ["Date", "Average Correlation"]
+        fig_rolling = px.line(
+            rolling_df,
+            x="Date",
+            y="Average Correlation",
+            title=f"Average Fund Correlation ({int(window)}-Day Rolling Window)",
+        )
+        fig_rolling.update_layout(title_x=0.5, height=350)
+        st.plotly_chart(fig_rolling, use_container_width=True)
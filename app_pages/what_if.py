@@ -0,0 +1,150 @@
+import streamlit as st
+import datetime
+import pandas as pd
+import plotly.graph_objects as go
+from database import DEFAULT_PORTFOLIO
+from simulation import PERCENTILES, historical_returns, simulate
+
+
+def _band_traces(bands, start_value, name, color):
+    """Returns the plotly traces of a 5-95% band, a 25-75% band and the median."""
+    days = list(bands.index)
+    values = bands * start_value
+    traces = []
+    for low, high, opacity in (("p5", "p95", 0.15), ("p25", "p75", 0.3)):
+        traces.append(
+            go.Scatter(
+                x=days + days[::-1],
+                y=list(values[high]) + list(values[low][::-1]),
+                fill="toself",
+                fillcolor=color.replace("1)", f"{opacity})"),
+                line={"width": 0},
+                name=f"{name} {low[1:]}-{high[1:]}%",
+                hoverinfo="skip",
+            )
+        )
+    traces.append(
+        go.Scatter(
+            x=days, y=values["p50"], line={"color": color}, name=f"{name} median"
+        )
+    )
+    return traces
+
+
+def show_what_if():
+    portfolio = st.session_state.get("portfolio", DEFAULT_PORTFOLIO)
+    st.title("🔮 What-If Simulation")
+    st.caption(f"Portfolio: {portfolio}")
+    st.markdown(
+        "Projects your portfolio by replaying randomly drawn historical days. "
+        "Each allocation is rebalanced to its weights every day."
+    )
+
+    # --- History and simulation settings ---
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        history_start = st.date_input(
+            "History Start:", datetime.date.today() - datetime.timedelta(days=365)
+        )
+        history_end = st.date_input("History End:", datetime.date.today())
+    with col2:
+        horizon = st.number_input("Horizon (days):", min_value=5, value=252, step=21)
+        paths = st.selectbox(
+            "Number of paths:", [1_000, 10_000, 50_000, 100_000], index=1
+        )
+    with col3:
+        block = st.number_input(
+            "Block length (days drawn together):", min_value=1, value=1
+        )
+        seed = st.number_input("Seed:", min_value=0, value=42)
+
+    if history_start > history_end:
+        st.error("Start date cannot be after end date.")
+        return
+
+    returns, last_values = historical_returns(
+        history_start, history_end, portfolio=portfolio
+    )
+    if returns is None:
+        st.warning("Not enough data in the selected history range.")
+        return
+    st.caption(f"{len(returns)} historical days of {returns.shape[1]} holdings.")
+
+    # --- Allocations ---
+    if last_values.sum() <= 0:
+        st.warning(
+            f"Nothing is held on the last day of the history range "
+            f"({returns.index[-1]}), so there is no current allocation. "
+            "Choose a history range that ends on a day with holdings."
+        )
+        return
+    current = last_values / last_values.sum() * 100
+    allocation = st.data_editor(
+        pd.DataFrame(
+            {
+                "Current %": current.round(2).to_numpy(),
+                "Proposed %": current.round(2).to_numpy(),
+            },
+            index=current.index.rename("Holding"),
+        ),
+        disabled=["Current %"],
+        use_container_width=True,
+    )
+    # Cleared cells count as 0, NaN weights must never reach the simulation
+    proposed = allocation["Proposed %"].fillna(0).clip(lower=0)
+    if proposed.sum() <= 0:
+        st.error("At least one proposed weight must be positive.")
+        return
+    if abs(proposed.sum() - 100) > 0.01:
+        st.info(
+            f"Proposed weights sum to {proposed.sum():.2f}%, they are scaled to 100%."
+        )
+
+    if not st.button("Run Simulation"):
+        return
+
+    start_value = last_values.sum()
+    with st.spinner("Simulating..."):
+        results = {
+            name: simulate(
+                returns,
+                weights,
+                horizon=int(horizon),
+                paths=int(paths),
+                seed=int(seed),
+                block=int(block),
+            )
+            for name, weights in (("Current", current), ("Proposed", proposed))
+        }
+
+    # --- Results ---
+    columns = st.columns(2)
+    for column, (name, result) in zip(columns, results.items()):
+        with column:
+            st.subheader(f"📌 {name} Allocation")
+            final = result["final"] * start_value
+            st.metric("Probability of Loss", f"{result['probability_of_loss']:.1%}")
+            st.metric("Median End Value (TL)", f"{pd.Series(final).median():,.2f}")
+            st.metric(
+                f"{PERCENTILES[0]}th Percentile End Value (TL)",
+                f"{pd.Series(final).quantile(PERCENTILES[0] / 100):,.2f}",
+            )
+
+    fig = go.Figure()
+    colors = {"Current": "rgba(31, 119, 180, 1)", "Proposed": "rgba(44, 160, 44, 1)"}
+    for name, result in results.items():
+        for trace in _band_traces(result["bands"], start_value, name, colors[name]):
+            fig.add_trace(trace)
+    fig.update_layout(
+        title="Projected Portfolio Value (Percentile Bands)",
+        xaxis_title="Days Ahead",
+        yaxis_title="Value (TL)",
+        title_x=0.5,
+        height=500,
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.caption(
+        "Past returns do not guarantee future results. Days are drawn from the "
+        "selected history, so its market conditions shape the projection."
+    )
@@ -0,0 +1,270 @@
+"""
+Compressed, content-addressed archive for the raw daily input files.
+
+Every uploaded file is split into its header line (fund or asset names) and
+its payload (the values). Both parts are stored gzip-compressed under their
+SHA-256 hash, so the long fund-name header that repeats every day is kept
+only once. A small JSON index maps each portfolio and date to the blobs it
+is made of. Blobs are shared across portfolios. Changes to the index are
+made under a lock (threads and processes), so concurrent uploads never
+overwrite each other's entries.
+
+Layout:
+    data_archive/index.json
+    data_archive/blobs/ab/ab12...ef.gz
+"""
+
+import contextlib
+import datetime
+import glob
+import gzip
+import hashlib
+import json
+import os
+import threading
+from io import StringIO
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from database import DEFAULT_PORTFOLIO
+
+ARCHIVE_DIR = "data_archive"
+BLOB_DIR = os.path.join(ARCHIVE_DIR, "blobs")
+INDEX_PATH = os.path.join(ARCHIVE_DIR, "index.json")
+LOCK_PATH = os.path.join(ARCHIVE_DIR, "index.lock")
+KINDS = ("funds", "assets")
+
+# Stored in the index, so its layout never has to be guessed from key names
+INDEX_VERSION = 2
+
+# Serializes index updates of the threads of this process, the lock file
+# those of other processes (e.g. the app and an ingest script)
+_index_lock = threading.RLock()
+
+
+@contextlib.contextmanager
+def _locked():
+    """Holds the archive lock; read, change and save the index inside it."""
+    with _index_lock:
+        os.makedirs(ARCHIVE_DIR, exist_ok=True)
+        with open(LOCK_PATH, "a+b") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _load_index():
+    """
+    Returns the archive index as {portfolio: {kind: {date: entry}}},
+    or an empty index if none exists yet.
+    """
+    if not os.path.exists(INDEX_PATH):
+        return {}
+    with open(INDEX_PATH, "r", encoding="utf-8") as f:
+        index = json.load(f)
+    if isinstance(index.get("version"), int):
+        return index["portfolios"]
+    # Unversioned indexes are converted here and saved with a version on the
+    # next write. Those written before multi-portfolio support are keyed by
+    # kind and hold the dated entries directly.
+    if _is_kind_layout(index):
+        index = {DEFAULT_PORTFOLIO: index}
+    return index
+
+
+def _is_kind_layout(index):
+    """True for an index of the form {kind: {date: entry}}."""
+    return all(
+        key in KINDS
+        and all(
+            isinstance(entry, dict) and "header" in entry for entry in value.values()
+        )
+        for key, value in index.items()
+    )
+
+
+def _entries(index, kind, portfolio):
+    return index.setdefault(portfolio, {}).setdefault(kind, {})
+
+
+def _save_index(index):
+    """Writes the index atomically so a crash never leaves it half-written."""
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    tmp_path = INDEX_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"version": INDEX_VERSION, "portfolios": index},
+            f,
+            indent=1,
+            sort_keys=True,
+        )
+    os.replace(tmp_path, INDEX_PATH)
+
+
+def _blob_path(digest):
+    return os.path.join(BLOB_DIR, digest[:2], f"{digest}.gz")
+
+
+def _put_blob(text):
+    """Stores text compressed under its hash and returns the hash."""
+    data = text.encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()
+    path = _blob_path(digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(gzip.compress(data))
+        os.replace(tmp_path, path)
+    return digest
+
+
+def _get_blob(digest):
+    with open(_blob_path(digest), "rb") as f:
+        return gzip.decompress(f.read()).decode("utf-8")
+
+
+def _split_raw(text):
+    """Splits raw file content into (header line, remaining payload)."""
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return "", ""
+    return lines[0], "\n".join(lines[1:])
+
+
+def store_raw(kind, date: datetime.date, text, portfolio=DEFAULT_PORTFOLIO):
+    """
+    Archives the raw content of a daily input file.
+    kind: "funds" or "assets"
+    date: datetime.date - the date the data belongs to
+    text: str or bytes - raw file content
+    portfolio: str - the portfolio the data belongs to
+    """
+    if isinstance(text, bytes):
+        text = text.decode("utf-8")
+    header, payload = _split_raw(text)
+    # Blobs are written under the lock too, so garbage collection cannot
+    # delete them before the index refers to them
+    with _locked():
+        index = _load_index()
+        _entries(index, kind, portfolio)[date.isoformat()] = {
+            "header": _put_blob(header),
+            "payload": _put_blob(payload),
+        }
+        _save_index(index)
+
+
+def read_raw(kind, date: datetime.date, portfolio=DEFAULT_PORTFOLIO):
+    """Returns the archived text for a date, or None if it is not archived."""
+    entry = _entries(_load_index(), kind, portfolio).get(date.isoformat())
+    if entry is None:
+        return None
+    return _get_blob(entry["header"]) + "\n" + _get_blob(entry["payload"])
+
+
+def remove_raw(kind, date: datetime.date, portfolio=DEFAULT_PORTFOLIO):
+    """Drops a date from the index. Returns True if it was archived."""
+    with _locked():
+        index = _load_index()
+        entries = _entries(index, kind, portfolio)
+        removed = entries.pop(date.isoformat(), None) is not None
+        if removed:
+            _save_index(index)
+    return removed
+
+
+def archived_portfolios():
+    """Returns the sorted names of all portfolios in the archive."""
+    return sorted(_load_index().keys())
+
+
+def archived_dates(kind, portfolio=DEFAULT_PORTFOLIO):
+    """Returns the sorted list of archived dates for the given kind."""
+    return sorted(
+        datetime.date.fromisoformat(d)
+        for d in _entries(_load_index(), kind, portfolio).keys()
+    )
+
+
+def iter_raw(kind, portfolio=DEFAULT_PORTFOLIO, dates=None):
+    """
+    Yields (date, StringIO) pairs in date order, decompressing one file at a time.
+    Header blobs shared by many days are decompressed only once.
+    """
+    entries = _entries(_load_index(), kind, portfolio)
+    header_cache = {}
+    for date_str in sorted(entries):
+        date = datetime.date.fromisoformat(date_str)
+        if dates is not None and date not in dates:
+            continue
+        entry = entries[date_str]
+        if entry["header"] not in header_cache:
+            header_cache[entry["header"]] = _get_blob(entry["header"])
+        text = header_cache[entry["header"]] + "\n" + _get_blob(entry["payload"])
+        yield date, StringIO(text)
+
+
+def collect_garbage():
+    """Deletes blobs that are no longer referenced by the index."""
+    with _locked():
+        index = _load_index()
+        referenced = {
+            digest
+            for kinds in index.values()
+            for entries in kinds.values()
+            for entry in entries.values()
+            for digest in entry.values()
+        }
+        removed = 0
+        for path in glob.glob(os.path.join(BLOB_DIR, "*", "*.gz")):
+            if os.path.basename(path)[: -len(".gz")] not in referenced:
+                os.remove(path)
+                removed += 1
+    return removed
+
+
+def import_txt_files(remove_originals=False):
+    """
+    Moves the legacy plain-text files from 'data_funds/' and 'data_assets/'
+    into the archive of the default portfolio. Already archived dates are
+    left untouched.
+    """
+    imported = 0
+    for kind in KINDS:
+        already = set(archived_dates(kind))
+        for file_path in sorted(glob.glob(f"data_{kind}/**/*.txt", recursive=True)):
+            filename = os.path.basename(file_path)
+            try:
+                date = datetime.datetime.strptime(
+                    filename.replace(".txt", ""), "%Y-%m-%d"
+                ).date()
+            except ValueError:
+                print(f"{filename} wrong filename format. Use YYYY-MM-DD.txt")
+                continue
+            if date not in already:
+                with open(file_path, "r", encoding="utf-8") as f:
+                    store_raw(kind, date, f.read())
+                imported += 1
+            if remove_originals:
+                os.remove(file_path)
+    print(f"{imported} files imported into '{ARCHIVE_DIR}/'.")
+    return imported
+
+
+if __name__ == "__main__":
+    import_txt_files()
+    print(f"{collect_garbage()} unreferenced blobs removed.")
@@ -0,0 +1,259 @@
+"""
+Online backups of the investment database.
+
+Snapshots are taken with SQLite's online backup API, copying a few pages per
+step and pausing in between, so the app can keep reading and writing while a
+backup runs. Each snapshot is checked, gzip-compressed and stored as
+backups/investments-<YYYYmmdd-HHMMSS>.db.gz; old snapshots are pruned by a
+retention policy.
+
+    python backup.py create                     # one snapshot + prune
+    python backup.py list
+    python backup.py schedule --every 6         # snapshot every 6 hours
+    python backup.py restore investments-20251019-120000.db.gz
+
+Restore replaces db/investments.db, so stop the app and the API first.
+"""
+
+import argparse
+import datetime
+import gzip
+import os
+import shutil
+import sqlite3
+import threading
+
+from database import DB_PATH
+
+BACKUP_DIR = "backups"
+PREFIX = "investments-"
+SUFFIX = ".db.gz"
+TIMESTAMP_FORMAT = "%Y%m%d-%H%M%S"
+
+# Pages copied per backup step and pause between steps (seconds)
+PAGES_PER_STEP = 256
+STEP_SLEEP = 0.01
+
+# Grandfather-father-son retention: the newest keep_last snapshots plus the
+# newest snapshot of each of the last keep_daily days, keep_weekly weeks and
+# keep_monthly months
+DEFAULT_RETENTION = {
+    "keep_last": 5,
+    "keep_daily": 7,
+    "keep_weekly": 4,
+    "keep_monthly": 12,
+}
+
+
+def integrity_check(db_path):
+    """Returns True if SQLite's integrity check of the database passes."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        result = conn.execute("PRAGMA integrity_check").fetchall()
+    except sqlite3.DatabaseError as e:
+        print(f"❌ {db_path} is not a valid database: {e}")
+        return False
+    finally:
+        conn.close()
+    if result != [("ok",)]:
+        print(f"❌ Integrity check of {db_path} failed: {result[:5]}")
+        return False
+    return True
+
+
+def _snapshot_time(name):
+    """Returns the datetime encoded in a snapshot file name, or None."""
+    if not (name.startswith(PREFIX) and name.endswith(SUFFIX)):
+        return None
+    try:
+        return datetime.datetime.strptime(
+            name[len(PREFIX) : -len(SUFFIX)], TIMESTAMP_FORMAT
+        )
+    except ValueError:
+        return None
+
+
+def list_backups(backup_dir=BACKUP_DIR):
+    """Returns (datetime, file name) of all snapshots, newest first."""
+    if not os.path.isdir(backup_dir):
+        return []
+    snapshots = [
+        (_snapshot_time(name), name)
+        for name in os.listdir(backup_dir)
+        if _snapshot_time(name) is not None
+    ]
+    return sorted(snapshots, reverse=True)
+
+
+def create_backup(
+    db_path=DB_PATH,
+    backup_dir=BACKUP_DIR,
+    pages=PAGES_PER_STEP,
+    sleep=STEP_SLEEP,
+):
+    """
+    Takes a consistent snapshot of the live database and stores it compressed.
+    Returns the path of the snapshot, or None if the copy failed its check.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    name = f"{PREFIX}{datetime.datetime.now().strftime(TIMESTAMP_FORMAT)}{SUFFIX}"
+    path = os.path.join(backup_dir, name)
+    copy_path = path[: -len(".gz")] + ".part"
+
+    source = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    target = sqlite3.connect(copy_path)
+    try:
+        # Locks are only held for one step of `pages` pages at a time; SQLite
+        # restarts the copy by itself if another connection writes meanwhile
+        source.backup(target, pages=pages, sleep=sleep)
+    finally:
+        target.close()
+        source.close()
+
+    try:
+        if not integrity_check(copy_path):
+            return None
+        with open(copy_path, "rb") as src, gzip.open(path + ".part", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(path + ".part", path)
+    finally:
+        os.remove(copy_path)
+
+    print(f"✅ Backup written to {path} ({os.path.getsize(path):,} bytes).")
+    return path
+
+
+def select_to_keep(snapshots, retention=DEFAULT_RETENTION):
+    """Returns the names of the snapshots (newest first) kept by the policy."""
+    keep = {name for _, name in snapshots[: retention["keep_last"]]}
+    buckets = {
+        "keep_daily": lambda t: t.date(),
+        "keep_weekly": lambda t: t.isocalendar()[:2],
+        "keep_monthly": lambda t: (t.year, t.month),
+    }
+    for rule, bucket_of in buckets.items():
+        seen = []
+        for taken_at, name in snapshots:
+            bucket = bucket_of(taken_at)
+            if bucket in seen:
+                continue
+            if len(seen) == retention[rule]:
+                break
+            seen.append(bucket)
+            keep.add(name)
+    return keep
+
+
+def prune_backups(backup_dir=BACKUP_DIR, retention=DEFAULT_RETENTION):
+    """Deletes the snapshots not kept by the retention policy."""
+    snapshots = list_backups(backup_dir)
+    keep = select_to_keep(snapshots, retention)
+    removed = [name for _, name in snapshots if name not in keep]
+    for name in removed:
+        os.remove(os.path.join(backup_dir, name))
+    if removed:
+        print(f"🗑️ Removed {len(removed)} old backups, {len(keep)} kept.")
+    return removed
+
+
+def restore_backup(name, db_path=DB_PATH, backup_dir=BACKUP_DIR):
+    """
+    Replaces the database with a snapshot after checking the snapshot's
+    integrity. The current database is kept as '<db_path>.before-restore'.
+    Returns True on success.
+    """
+    path = name if os.path.exists(name) else os.path.join(backup_dir, name)
+    if not os.path.exists(path):
+        print(f"❌ Backup {name} not found.")
+        return False
+
+    restored_path = db_path + ".restore"
+    with gzip.open(path, "rb") as src, open(restored_path, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    if not integrity_check(restored_path):
+        os.remove(restored_path)
+        return False
+
+    if os.path.exists(db_path):
+        # Online copy of the current database, including any unmerged journal
+        previous = sqlite3.connect(db_path)
+        saved = sqlite3.connect(db_path + ".before-restore")
+        previous.backup(saved)
+        saved.close()
+        previous.close()
+    os.replace(restored_path, db_path)
+    print(f"✅ Database restored from {path}.")
+    return True
+
+
+class BackupScheduler(threading.Thread):
+    """Background thread that takes a backup and prunes every interval seconds."""
+
+    def __init__(
+        self,
+        interval,
+        db_path=DB_PATH,
+        backup_dir=BACKUP_DIR,
+        retention=DEFAULT_RETENTION,
+    ):
+        super().__init__(name="backup-scheduler", daemon=True)
+        self.interval = interval
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        self.retention = retention
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                create_backup(self.db_path, self.backup_dir)
+                prune_backups(self.backup_dir, self.retention)
+            except (OSError, sqlite3.Error) as e:
+                print(f"❌ Scheduled backup failed: {e}")
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Back up and restore the database.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--dir", default=BACKUP_DIR)
+    for rule, default in DEFAULT_RETENTION.items():
+        parser.add_argument(f"--{rule.replace('_', '-')}", type=int, default=default)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("create", help="Take a snapshot and prune old ones")
+    commands.add_parser("list", help="List snapshots")
+    commands.add_parser("prune", help="Apply the retention policy")
+    schedule = commands.add_parser("schedule", help="Take snapshots periodically")
+    schedule.add_argument("--every", type=float, default=6, help="Hours")
+    restore = commands.add_parser("restore", help="Restore a snapshot")
+    restore.add_argument("name")
+    args = parser.parse_args()
+
+    retention = {rule: getattr(args, rule) for rule in DEFAULT_RETENTION}
+    if args.command == "create":
+        if create_backup(args.db, args.dir):
+            prune_backups(args.dir, retention)
+    elif args.command == "list":
+        for taken_at, name in list_backups(args.dir):
+            size = os.path.getsize(os.path.join(args.dir, name))
+            print(f"{taken_at:%Y-%m-%d %H:%M:%S}  {name}  {size:,} bytes")
+    elif args.command == "prune":
+        prune_backups(args.dir, retention)
+    elif args.command == "schedule":
+        scheduler = BackupScheduler(args.every * 3600, args.db, args.dir, retention)
+        scheduler.start()
+        print(f"⏰ Backing up {args.db} every {args.every:g} hours (Ctrl+C to stop).")
+        try:
+            scheduler.join()
+        except KeyboardInterrupt:
+            scheduler.stop()
+    elif args.command == "restore":
+        if not restore_backup(args.name, args.db, args.dir):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
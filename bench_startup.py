@@ -0,0 +1,159 @@
+"""
+Measures the cold import time of the app entry point and of every page.
+
+Each target is imported in a fresh interpreter, so nothing is cached between
+runs; the fastest of --runs runs is kept. Results can be saved as a baseline
+and later runs compared against it to catch startup regressions.
+
+    python bench_startup.py --save        # record startup_baseline.json
+    python bench_startup.py --check       # fail if a target got slower
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+BASELINE_FILE = "startup_baseline.json"
+DB_PATH = os.path.join("db", "investments.db")
+
+# The benchmark runs ensure_db() against a copy of the database at this path,
+# so the real one is never migrated or locked by a benchmark run
+DB_ENV = "BENCH_DB_PATH"
+
+# What app.py runs before any page is selected, followed by each page
+TARGETS = {
+    "app": (
+        "import os, database; "
+        f"database.DB_PATH = os.environ[{DB_ENV!r}]; "
+        "database.ensure_db()"
+    ),
+    "page: analysis": "import app_pages.analysis",
+    "page: visual_analysis": "import app_pages.visual_analysis",
+    "page: what_if": "import app_pages.what_if",
+    "page: cash_flows": "import app_pages.cash_flows",
+    "page: add_data": "import app_pages.add_data",
+    "page: delete_data": "import app_pages.delete_data",
+}
+
+# Measured times below this are noise and never count as a regression
+MIN_SECONDS = 0.05
+
+
+def copy_database(tmp_dir):
+    """
+    Copies the app database into tmp_dir and points the targets at the copy.
+    Without a database, ensure_db() creates an empty one there.
+    """
+    path = os.path.join(tmp_dir, "investments.db")
+    source = os.path.join(os.path.dirname(os.path.abspath(__file__)), DB_PATH)
+    if os.path.exists(source):
+        shutil.copyfile(source, path)
+    os.environ[DB_ENV] = path
+
+
+def time_import(statement, runs):
+    """Returns the fastest wall time in seconds of running statement cold."""
+    code = (
+        "import time; t = time.perf_counter(); "
+        f"{statement}; print(time.perf_counter() - t)"
+    )
+    best = None
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout
+        seconds = float(output.strip().splitlines()[-1])
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def slowest_modules(statement, top=10):
+    """Returns the top (cumulative microseconds, module) pairs of -X importtime."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    ).stderr
+    modules = []
+    for line in stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            modules.append((int(parts[1]), parts[2].strip()))
+    return sorted(modules, reverse=True)[:top]
+
+
+def check(results, baseline, max_regression):
+    """Returns the targets that are more than max_regression times slower."""
+    regressions = []
+    for name, seconds in results.items():
+        before = baseline.get(name)
+        if before is None or seconds < MIN_SECONDS:
+            continue
+        if seconds > before * max_regression:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark app startup imports.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save", action="store_true", help="Store as the baseline")
+    parser.add_argument("--check", action="store_true", help="Compare to baseline")
+    parser.add_argument("--max-regression", type=float, default=1.5)
+    parser.add_argument(
+        "--profile", action="store_true", help="List the slowest modules of the app"
+    )
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # The first run migrates the copy if needed; the fastest run is kept
+        copy_database(tmp_dir)
+        for name, statement in TARGETS.items():
+            try:
+                results[name] = time_import(statement, args.runs)
+            except subprocess.CalledProcessError as e:
+                print(f"❌ {name}: import failed\n{e.stderr.strip()}")
+                sys.exit(1)
+            print(f"{name:<24} {results[name] * 1000:8.1f} ms")
+
+        if args.profile:
+            print("\nSlowest modules imported by the app:")
+            for microseconds, module in slowest_modules(TARGETS["app"]):
+                print(f"{module:<40} {microseconds / 1000:8.1f} ms")
+
+    if args.save:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Baseline saved to {args.baseline}")
+
+    if args.check:
+        if not os.path.exists(args.baseline):
+            print(f"❌ No baseline at {args.baseline}, run with --save first.")
+            sys.exit(1)
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = check(results, baseline, args.max_regression)
+        for name in regressions:
+            print(
+                f"❌ {name}: {results[name] * 1000:.1f} ms, "
+                f"baseline {baseline[name] * 1000:.1f} ms"
+            )
+        if regressions:
+            sys.exit(1)
+        print("✅ No startup regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+In-process result cache partitioned by portfolio.
+
+Each portfolio has its own bounded partition, and every stored result is
+tagged with the portfolio's data version. Writing to one portfolio therefore
+only invalidates that portfolio's entries, and a large portfolio can never
+evict the results of a small one.
+"""
+
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+
+from database import get_data_version
+
+MAX_ENTRIES_PER_PORTFOLIO = 32
+
+_partitions = {}
+_lock = threading.Lock()
+
+
+def _partition(portfolio):
+    with _lock:
+        return _partitions.setdefault(portfolio, OrderedDict())
+
+
+def portfolio_cached(func):
+    """
+    Caches a function whose results depend on a single portfolio.
+    The function must have a 'portfolio' parameter, which may be passed by
+    position or keyword. The other arguments must be hashable; they form
+    the cache key after defaults are applied, so equivalent calls share one
+    entry. Cached results are shared between callers and must not be
+    mutated; copy them first.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+        portfolio = arguments.pop("portfolio")
+        key = (func.__qualname__, tuple(arguments.items()))
+        version = get_data_version(portfolio)
+        partition = _partition(portfolio)
+
+        with _lock:
+            hit = partition.get(key)
+            if hit is not None and hit[0] == version:
+                partition.move_to_end(key)
+                return hit[1]
+
+        result = func(*bound.args, **bound.kwargs)
+
+        with _lock:
+            partition[key] = (version, result)
+            partition.move_to_end(key)
+            while len(partition) > MAX_ENTRIES_PER_PORTFOLIO:
+                partition.popitem(last=False)
+        return result
+
+    return wrapper
+
+
+def clear(portfolio=None):
+    """Drops the cached results of one portfolio, or of all portfolios."""
+    with _lock:
+        if portfolio is None:
+            _partitions.clear()
+        else:
+            _partitions.pop(portfolio, None)
@@ -0,0 +1,156 @@
+"""
+Correlation and covariance of daily fund returns.
+
+Returns are taken from the daily fund values of a range; a day counts as a
+return only if the fund was held on both that day and the previous one, other
+days count as 0 (flat). Matrices are computed with NumPy on the whole returns
+array at once and cached per portfolio, range and data version.
+"""
+
+import numpy as np
+import pandas as pd
+
+from analyze import get_all_funds_changes
+from cache import portfolio_cached
+from database import DEFAULT_PORTFOLIO
+
+ORDERINGS = ("spectral", "none")
+
+# At most this many windows are evaluated for the rolling average correlation
+MAX_ROLLING_POINTS = 120
+
+
+def daily_returns(pivot):
+    """Returns the daily returns (as fractions) of every column of a value pivot."""
+    values = pivot.to_numpy(dtype=float)
+    previous, current = values[:-1], values[1:]
+    held = (previous > 0) & (current > 0)
+    returns = np.zeros_like(current)
+    np.divide(current - previous, previous, out=returns, where=held)
+    return pd.DataFrame(returns, index=pivot.index[1:], columns=pivot.columns)
+
+
+def _correlation(returns):
+    """Returns the correlation matrix of the columns of a 2D returns array."""
+    centered = returns - returns.mean(axis=0)
+    std = np.sqrt((centered**2).sum(axis=0))
+    standardized = centered / std
+    return standardized.T @ standardized
+
+
+def spectral_order(correlation):
+    """
+    Returns column positions that place strongly correlated funds next to each
+    other: funds are sorted by the Fiedler vector (second smallest eigenvector)
+    of the graph Laplacian with affinities (1 + correlation) / 2.
+    """
+    if len(correlation) < 3:
+        return np.arange(len(correlation))
+    affinity = (1 + correlation) / 2
+    np.fill_diagonal(affinity, 0)
+    laplacian = np.diag(affinity.sum(axis=1)) - affinity
+    _, vectors = np.linalg.eigh(laplacian)
+    return np.argsort(vectors[:, 1], kind="stable")
+
+
+def rolling_average_correlation(returns, window):
+    """
+    Returns the average pairwise correlation of the funds over a sliding
+    window of returns, as a Series indexed by the last date of each window.
+    Uses that the sum of all entries of a correlation matrix equals the
+    squared norm of the row sums of the standardized returns.
+    """
+    count = returns.shape[1]
+    if count < 2 or len(returns) < window:
+        return pd.Series(dtype=float)
+
+    step = max(1, (len(returns) - window + 1) // MAX_ROLLING_POINTS)
+    ends = np.arange(window, len(returns) + 1, step)
+    values = returns.to_numpy()
+    averages = []
+    for end in ends:
+        block = values[end - window : end]
+        centered = block - block.mean(axis=0)
+        std = np.sqrt((centered**2).sum(axis=0))
+        moving = std > 0
+        n = moving.sum()
+        if n < 2:
+            averages.append(np.nan)
+            continue
+        row_sums = (centered[:, moving] / std[moving]).sum(axis=1)
+        averages.append(((row_sums**2).sum() - n) / (n * (n - 1)))
+    return pd.Series(averages, index=returns.index[ends - 1], name="avg_correlation")
+
+
+@portfolio_cached
+def get_fund_correlations(
+    start_date,
+    end_date,
+    portfolio=DEFAULT_PORTFOLIO,
+    window=None,
+    ordering="spectral",
+):
+    """
+    Returns the correlation and covariance of the daily fund returns in the
+    selected date range, or None if there are not enough data.
+    window: number of most recent returns the matrices are computed on
+    (None = the whole range); also enables the rolling average correlation.
+    ordering: "spectral" groups correlated funds together, "none" keeps the
+    fund codes sorted.
+    Funds whose value never changes in the window have no defined correlation
+    and are listed under "excluded".
+    """
+    if ordering not in ORDERINGS:
+        raise ValueError(f"Unknown ordering {ordering!r}, expected one of {ORDERINGS}")
+    fund_result = get_all_funds_changes(
+        start_date, end_date, portfolio=portfolio, resolution="day"
+    )
+    if fund_result is None:
+        return None
+
+    returns = daily_returns(fund_result["pivot"])
+    recent = returns if window is None else returns.iloc[-window:]
+    values = recent.to_numpy()
+    moving = values.std(axis=0) > 0
+    if len(recent) < 2 or moving.sum() < 2:
+        return None
+
+    values = values[:, moving]
+    codes = recent.columns[moving]
+    correlation = np.clip(_correlation(values), -1.0, 1.0)
+    covariance = np.cov(values, rowvar=False)
+    order = (
+        spectral_order(correlation)
+        if ordering == "spectral"
+        else np.arange(len(codes))
+    )
+    codes = codes[order]
+    correlation = correlation[np.ix_(order, order)]
+    covariance = covariance[np.ix_(order, order)]
+
+    # Diversification ratio: weighted average volatility / portfolio volatility,
+    # with the fund weights of the last day (1 = no diversification benefit)
+    weights = fund_result["pivot"].iloc[-1][codes].to_numpy(dtype=float)
+    weights = weights / weights.sum() if weights.sum() > 0 else weights
+    portfolio_volatility = np.sqrt(weights @ covariance @ weights)
+    diversification_ratio = (
+        float(weights @ np.sqrt(np.diag(covariance)) / portfolio_volatility)
+        if portfolio_volatility > 0
+        else np.nan
+    )
+
+    count = len(codes)
+    average = (correlation.sum() - count) / (count * (count - 1))
+    return {
+        "correlation": pd.DataFrame(correlation, index=codes, columns=codes),
+        "covariance": pd.DataFrame(covariance, index=codes, columns=codes),
+        "average_correlation": float(average),
+        "diversification_ratio": diversification_ratio,
+        "observations": len(recent),
+        "excluded": list(recent.columns[~moving]),
+        "rolling_average": (
+            None
+            if window is None
+            else rolling_average_correlation(returns[codes], window)
+        ),
+    }
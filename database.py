@@ -3,8 +3,11 @@ Creates the database and defines the FundValue model.
 """
 
 from sqlalchemy import (
+    Index,
     UniqueConstraint,
     create_engine,
+    inspect,
+    text,
     Column,
     Integer,
     String,
@@ -14,44 +17,299 @@ from sqlalchemy import (
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import datetime
+import threading
 
 Base = declarative_base()
 
+DEFAULT_PORTFOLIO = "default"
+
+# Asset categories offered in the UI; any other category name can be stored too
+DEFAULT_ASSET_CATEGORIES = ("precious_metals", "crypto", "physical_gold")
+
 
 class FundValue(Base):
     """
     Stores daily values for each individual fund.
-    Each (fund_code, date) pair is unique.
+    Each (portfolio, fund_code, date) triple is unique.
     """
 
     __tablename__ = "fund_values"
     id = Column(Integer, primary_key=True)
+    portfolio = Column(String, nullable=False, default=DEFAULT_PORTFOLIO)
     fund_code = Column(String, index=True)
     fund_name = Column(String)
     date = Column(Date, default=datetime.date.today)
     value_tl = Column(Float)
     __table_args__ = (
-        UniqueConstraint("fund_code", "date", name="unique_fund_per_day"),
+        UniqueConstraint(
+            "portfolio", "fund_code", "date", name="unique_fund_per_day"
+        ),
+        Index("ix_fund_values_portfolio_date", "portfolio", "date"),
     )
 
 
 class AssetValue(Base):
     """
-    Stores daily total values for each asset category (e.g., Precious Metals, Crypto, Physical Gold).
-    Each date appears only once.
+    Stores daily total values for each asset category (e.g., precious_metals, crypto, physical_gold).
+    One row per category and date, so new categories need no schema change.
+    Each (portfolio, category, date) triple is unique.
     """
 
     __tablename__ = "asset_values"
     id = Column(Integer, primary_key=True)
-    date = Column(Date, default=datetime.date.today, unique=True)
-    precious_metals_tl = Column(Float)
-    crypto_tl = Column(Float)
-    physical_gold_tl = Column(Float)
+    portfolio = Column(String, nullable=False, default=DEFAULT_PORTFOLIO)
+    category = Column(String, nullable=False)
+    date = Column(Date, default=datetime.date.today)
+    value_tl = Column(Float)
+    __table_args__ = (
+        UniqueConstraint(
+            "portfolio", "category", "date", name="unique_asset_per_day"
+        ),
+        Index("ix_asset_values_portfolio_date", "portfolio", "date"),
+    )
+
+
+class ValueRollup(Base):
+    """
+    Stores weekly and monthly aggregates of a fund or asset category.
+    kind is "fund" or "asset", series is the fund code or asset category, and
+    period is "week" (starting Monday) or "month".
+    """
+
+    __tablename__ = "value_rollups"
+    id = Column(Integer, primary_key=True)
+    portfolio = Column(String, nullable=False, default=DEFAULT_PORTFOLIO)
+    kind = Column(String, nullable=False)
+    series = Column(String, nullable=False)
+    period = Column(String, nullable=False)
+    period_start = Column(Date, nullable=False)
+    first_date = Column(Date)
+    last_date = Column(Date)
+    first_value = Column(Float)
+    last_value = Column(Float)
+    min_value = Column(Float)
+    max_value = Column(Float)
+    mean_value = Column(Float)
+    change_tl = Column(Float)
+    day_count = Column(Integer)
+    __table_args__ = (
+        UniqueConstraint(
+            "portfolio",
+            "kind",
+            "series",
+            "period",
+            "period_start",
+            name="unique_rollup_per_period",
+        ),
+        Index("ix_value_rollups_lookup", "portfolio", "kind", "period", "last_date"),
+    )
+
+
+class CashFlow(Base):
+    """
+    Stores deposits (positive amount) and withdrawals (negative amount) of a
+    fund or asset category. kind is "fund" or "asset", series is the fund
+    code or category. A day may have several flows.
+    """
+
+    __tablename__ = "cash_flows"
+    id = Column(Integer, primary_key=True)
+    portfolio = Column(String, nullable=False, default=DEFAULT_PORTFOLIO)
+    kind = Column(String, nullable=False)
+    series = Column(String, nullable=False)
+    date = Column(Date, nullable=False)
+    amount = Column(Float, nullable=False)
+    note = Column(String)
+    __table_args__ = (Index("ix_cash_flows_portfolio_date", "portfolio", "date"),)
+
+
+class GrowthIndex(Base):
+    """
+    Stores the cash-flow adjusted growth index of every fund and asset
+    category (and of the whole portfolio as kind "portfolio", series "total").
+    The index starts at 1 and is multiplied by each day's return, so the
+    time-weighted return between two dates is the ratio of their levels.
+    """
+
+    __tablename__ = "growth_index"
+    id = Column(Integer, primary_key=True)
+    portfolio = Column(String, nullable=False, default=DEFAULT_PORTFOLIO)
+    kind = Column(String, nullable=False)
+    series = Column(String, nullable=False)
+    date = Column(Date, nullable=False)
+    level = Column(Float, nullable=False)
+    __table_args__ = (
+        UniqueConstraint(
+            "portfolio", "kind", "series", "date", name="unique_growth_per_day"
+        ),
+        Index("ix_growth_index_portfolio_date", "portfolio", "date"),
+    )
+
+
+class DataVersion(Base):
+    """
+    Stores a counter per portfolio that is bumped on every write.
+    Caches use it to tell whether a stored result is still valid.
+    """
+
+    __tablename__ = "data_versions"
+    portfolio = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
 
 
-engine = create_engine("sqlite:///db/investments.db")
-SessionLocal = sessionmaker(bind=engine)
+DB_PATH = "db/investments.db"
+
+_engine = None
+_session_factory = None
+_db_ready = False
+_lock = threading.RLock()
+
+
+def get_engine():
+    """Returns the process-wide engine, creating it on first use."""
+    global _engine, _session_factory
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                _engine = create_engine(f"sqlite:///{DB_PATH}")
+                _session_factory = sessionmaker(bind=_engine)
+    return _engine
+
+
+def SessionLocal():
+    """Returns a new session bound to the process-wide engine."""
+    get_engine()
+    return _session_factory()
+
+
+def _rename_to_old(conn, table):
+    """
+    Renames a table to '<name>_old' and creates the current schema in its place.
+    Renamed tables keep their index names, so those are dropped first.
+    """
+    old_table = f"{table.name}_old"
+    conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {old_table}"))
+    old_indexes = conn.execute(
+        text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' "
+            "AND tbl_name = :table AND sql IS NOT NULL"
+        ),
+        {"table": old_table},
+    ).scalars()
+    for index_name in list(old_indexes):
+        conn.execute(text(f"DROP INDEX {index_name}"))
+    table.create(conn)
+    return old_table
+
+
+def _add_portfolio_column(conn, table):
+    """
+    Rebuilds a single-portfolio table with the portfolio column.
+    SQLite cannot drop the old unique constraints in place, so the rows are
+    copied into a freshly created table and assigned to the default portfolio.
+    """
+    old_table = _rename_to_old(conn, table)
+    columns = [c.name for c in table.columns if c.name != "portfolio"]
+    column_list = ", ".join(columns)
+    conn.execute(
+        text(
+            f"INSERT OR IGNORE INTO {table.name} (portfolio, {column_list}) "
+            f"SELECT :portfolio, {column_list} FROM {old_table}"
+        ),
+        {"portfolio": DEFAULT_PORTFOLIO},
+    )
+    conn.execute(text(f"DROP TABLE {old_table}"))
+
+
+def _assets_to_long_format(conn, old_columns):
+    """
+    Converts the old asset table with one column per category
+    (precious_metals_tl, crypto_tl, physical_gold_tl) into one row per category.
+    """
+    old_table = _rename_to_old(conn, AssetValue.__table__)
+    portfolio = "portfolio" if "portfolio" in old_columns else ":portfolio"
+    for category in DEFAULT_ASSET_CATEGORIES:
+        conn.execute(
+            text(
+                "INSERT OR IGNORE INTO asset_values "
+                "(portfolio, category, date, value_tl) "
+                f"SELECT {portfolio}, :category, date, {category}_tl FROM {old_table} "
+                f"WHERE {category}_tl IS NOT NULL"
+            ),
+            {"portfolio": DEFAULT_PORTFOLIO, "category": category},
+        )
+    conn.execute(text(f"DROP TABLE {old_table}"))
+    # Rollups of the old layout are keyed by column name, rebuild them
+    conn.execute(text("DELETE FROM value_rollups"))
 
 
 def init_db():
+    engine = get_engine()
     Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        # Databases created before long-format assets have one column per category
+        asset_columns = {c["name"] for c in inspector.get_columns("asset_values")}
+        if "category" not in asset_columns:
+            _assets_to_long_format(conn, asset_columns)
+        # Databases created before multi-portfolio support have no portfolio column
+        fund_columns = {c["name"] for c in inspector.get_columns("fund_values")}
+        if "portfolio" not in fund_columns:
+            _add_portfolio_column(conn, FundValue.__table__)
+
+    # Rollups did not exist in older databases, build them once from daily data
+    from rollups import rebuild_missing_rollups
+
+    rebuild_missing_rollups()
+
+
+def ensure_db():
+    """Runs init_db once per process; later calls return immediately."""
+    global _db_ready
+    if not _db_ready:
+        with _lock:
+            if not _db_ready:
+                init_db()
+                _db_ready = True
+
+
+def bump_data_version(session, portfolio=DEFAULT_PORTFOLIO):
+    """Marks the data of a portfolio as changed. The caller commits."""
+    row = session.get(DataVersion, portfolio)
+    if row is None:
+        session.add(DataVersion(portfolio=portfolio, version=1))
+    else:
+        row.version += 1
+
+
+def get_data_version(portfolio=DEFAULT_PORTFOLIO):
+    """Returns the current data version of a portfolio (0 if never written)."""
+    session = SessionLocal()
+    row = session.get(DataVersion, portfolio)
+    session.close()
+    return row.version if row else 0
+
+
+def list_asset_categories(portfolio=DEFAULT_PORTFOLIO):
+    """Returns the default asset categories followed by any others in use."""
+    session = SessionLocal()
+    used = {
+        row[0]
+        for row in session.query(AssetValue.category)
+        .filter(AssetValue.portfolio == portfolio)
+        .distinct()
+    }
+    session.close()
+    return list(DEFAULT_ASSET_CATEGORIES) + sorted(
+        used - set(DEFAULT_ASSET_CATEGORIES)
+    )
+
+
+def list_portfolios():
+    """Returns the sorted names of all portfolios that have any data."""
+    session = SessionLocal()
+    names = {row[0] for row in session.query(FundValue.portfolio).distinct()}
+    names |= {row[0] for row in session.query(AssetValue.portfolio).distinct()}
+    session.close()
+    return sorted(names) or [DEFAULT_PORTFOLIO]
@@ -0,0 +1,169 @@
+"""
+Streaming export of daily values, TL changes and % changes.
+
+The date range is read from the database one month at a time and every chunk
+is appended to the output files before the next one is read, so memory use
+does not grow with the length of the range. CSV files can be gzip-compressed;
+XLSX files (one sheet per table, requires openpyxl) are zip-compressed anyway.
+
+    python export.py --kind fund --start 2023-01-01 --end 2025-10-19
+    python export.py --kind asset --tables values changes --format xlsx
+    python export.py --kind fund --start 2020-01-01 --gzip --out exports
+"""
+
+import argparse
+import datetime
+import gzip
+import importlib.util
+import os
+
+from analyze import KINDS, iter_change_chunks
+from database import DEFAULT_PORTFOLIO, ensure_db
+from outputs import file_name
+
+TABLES = ("values", "changes", "pct_changes")
+FORMATS = ("csv", "xlsx")
+
+
+def available_formats():
+    """Returns the formats that can be written here (XLSX needs openpyxl)."""
+    if importlib.util.find_spec("openpyxl") is None:
+        return ("csv",)
+    return FORMATS
+
+
+def export_path(out_dir, portfolio, name, start_date, end_date, extension):
+    return os.path.join(
+        out_dir, f"{file_name(portfolio)}_{name}_{start_date}_{end_date}.{extension}"
+    )
+
+
+def _skip_if_empty(chunks):
+    """Returns an iterator over chunks, or None if there are none."""
+    first = next(chunks, None)
+    if first is None:
+        return None
+
+    def chained():
+        yield first
+        yield from chunks
+
+    return chained()
+
+
+def _open_csv(path, compress):
+    if compress:
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def _write_csv(chunks, paths, compress):
+    files = {table: _open_csv(path, compress) for table, path in paths.items()}
+    try:
+        header = True
+        for chunk in chunks:
+            for table, frame in chunk.items():
+                if table in files:
+                    frame.to_csv(files[table], header=header, index_label="date")
+            header = False
+    finally:
+        for f in files.values():
+            f.close()
+
+
+def _write_xlsx(chunks, path, tables):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise RuntimeError("XLSX export requires openpyxl: pip install openpyxl")
+
+    # Write-only workbooks stream rows to disk instead of keeping them in memory
+    workbook = Workbook(write_only=True)
+    sheets = {table: workbook.create_sheet(table) for table in tables}
+    header = True
+    for chunk in chunks:
+        for table, sheet in sheets.items():
+            frame = chunk[table]
+            if header:
+                sheet.append(["date"] + list(frame.columns))
+            for date, row in zip(frame.index, frame.itertuples(index=False)):
+                sheet.append([date] + list(row))
+        header = False
+    workbook.save(path)
+
+
+def export_changes(
+    kind,
+    start_date,
+    end_date,
+    portfolio=DEFAULT_PORTFOLIO,
+    tables=TABLES,
+    fmt="csv",
+    compress=False,
+    out_dir="exports",
+):
+    """
+    Streams the selected tables of funds or assets in the date range to files
+    in out_dir. Returns the list of written paths (empty if there is no data).
+    """
+    chunks = (
+        {"values": values, "changes": changes, "pct_changes": pct_changes}
+        for values, changes, pct_changes in iter_change_chunks(
+            kind, start_date, end_date, portfolio=portfolio
+        )
+    )
+    chunks = _skip_if_empty(chunks)
+    if chunks is None:
+        print("❌ No data available for the selected date range.")
+        return []
+
+    os.makedirs(out_dir, exist_ok=True)
+    if fmt == "xlsx":
+        path = export_path(out_dir, portfolio, kind, start_date, end_date, "xlsx")
+        _write_xlsx(chunks, path, tables)
+        return [path]
+
+    extension = "csv.gz" if compress else "csv"
+    paths = {
+        table: export_path(
+            out_dir, portfolio, f"{kind}_{table}", start_date, end_date, extension
+        )
+        for table in tables
+    }
+    _write_csv(chunks, paths, compress)
+    return list(paths.values())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export daily values and changes.")
+    parser.add_argument("--kind", choices=list(KINDS), default="fund")
+    parser.add_argument("--start", type=datetime.date.fromisoformat, required=True)
+    parser.add_argument(
+        "--end", type=datetime.date.fromisoformat, default=datetime.date.today()
+    )
+    parser.add_argument("--portfolio", default=DEFAULT_PORTFOLIO)
+    parser.add_argument("--tables", nargs="+", choices=TABLES, default=list(TABLES))
+    parser.add_argument("--format", choices=FORMATS, default="csv", dest="fmt")
+    parser.add_argument("--gzip", action="store_true", help="Compress CSV output")
+    parser.add_argument("--out", default="exports", help="Output directory")
+    args = parser.parse_args(argv)
+
+    if args.start > args.end:
+        parser.error("start date is after end date")
+    ensure_db()
+    written = export_changes(
+        args.kind,
+        args.start,
+        args.end,
+        portfolio=args.portfolio,
+        tables=args.tables,
+        fmt=args.fmt,
+        compress=args.gzip,
+        out_dir=args.out,
+    )
+    for path in written:
+        print(f"✅ Exported {path}")
+
+
+if __name__ == "__main__":
+    main()
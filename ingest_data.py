@@ -4,18 +4,24 @@ Contains functions to parse and save both fund and asset data files to the datab
 
 import datetime
 import glob
+import heapq
 import os
 import numpy as np
+import archive
+from returns import rebuild_growth_index, refresh_growth_index
+from rollups import rebuild_rollups, refresh_rollups
 from sqlalchemy.exc import IntegrityError
-from database import FundValue, AssetValue, SessionLocal, init_db
+from database import (
+    DEFAULT_PORTFOLIO,
+    AssetValue,
+    FundValue,
+    SessionLocal,
+    bump_data_version,
+    init_db,
+)
 
 
-def parse_and_save_funds(file_path_or_buffer, date: datetime.date):
-    """
-    Saves fund data from a text file or StringIO to the database.
-    file_path_or_buffer: str or StringIO - path to the text file or StringIO object
-    date: datetime.date - the date for the fund values
-    """
+def _read_lines(file_path_or_buffer):
     # Detect file path or file-like object
     if isinstance(file_path_or_buffer, str):
         f = open(file_path_or_buffer, "r", encoding="utf-8")
@@ -23,11 +29,19 @@ def parse_and_save_funds(file_path_or_buffer, date: datetime.date):
         f = file_path_or_buffer
 
     with f:
-        lines = [line.strip() for line in f.readlines() if line.strip()]
+        return [line.strip() for line in f.readlines() if line.strip()]
+
+
+def parse_funds(file_path_or_buffer):
+    """
+    Parses fund data from a text file or StringIO without saving it.
+    Returns a list of (fund_code, fund_name, value) or None if the format is wrong.
+    """
+    lines = _read_lines(file_path_or_buffer)
 
     if len(lines) < 2:
         print(f"{file_path_or_buffer} wrong format: less than 2 lines found.")
-        return
+        return None
 
     names = lines[0].split("\t")
     values = lines[1].split("\t")
@@ -36,23 +50,46 @@ def parse_and_save_funds(file_path_or_buffer, date: datetime.date):
         print(
             f"{file_path_or_buffer} wrong format: {len(names)} fund names, {len(values)} values found."
         )
-        return
+        return None
 
     # Convert values to float
     try:
         values = [float(v.replace(",", ".")) for v in values]
     except ValueError:
         print(f"{file_path_or_buffer} error: could not convert all values to float.")
+        return None
+
+    # Example: "GTZ-GPY Some Fund Name" -> code GTZ-GPY
+    return [
+        (name.split()[0], " ".join(name.split()[1:]), value)
+        for name, value in zip(names, values)
+    ]
+
+
+def parse_and_save_funds(
+    file_path_or_buffer,
+    date: datetime.date,
+    portfolio=DEFAULT_PORTFOLIO,
+    update_rollups=True,
+):
+    """
+    Saves fund data from a text file or StringIO to the database.
+    file_path_or_buffer: str or StringIO - path to the text file or StringIO object
+    date: datetime.date - the date for the fund values
+    portfolio: str - the portfolio the funds belong to
+    update_rollups: bool - refresh the rollups and the growth index of this date
+    """
+    funds = parse_funds(file_path_or_buffer)
+    if funds is None:
         return
 
     # Save to database
     session = SessionLocal()
     added_count = 0
 
-    for name, value in zip(names, values):
-        code = name.split()[0]  # Example: GTZ-GPY
-        fund_name = " ".join(name.split()[1:])
+    for code, fund_name, value in funds:
         entry = FundValue(
+            portfolio=portfolio,
             fund_code=code,
             fund_name=fund_name,
             value_tl=value,
@@ -67,95 +104,146 @@ def parse_and_save_funds(file_path_or_buffer, date: datetime.date):
             session.rollback()
             print(f"⚠️ Duplicate skipped: {code} ({date})")
 
+    if added_count:
+        bump_data_version(session, portfolio)
+        session.commit()
     session.close()
+    if added_count and update_rollups:
+        refresh_rollups(date, date, portfolio)
+        refresh_growth_index(date, portfolio)
     print(f"{added_count} fund records added from {file_path_or_buffer}.")
 
 
-def parse_and_save_asset(file_path_or_buffer, date: datetime.date):
+def parse_assets(file_path_or_buffer):
     """
-    Parses and saves asset data from text file or StringIO.
+    Parses asset data from a text file or StringIO without saving it.
+    Returns a list of (category, value) or None if the format is wrong.
     Expected format:
-        Line 1: Precious Metals    Crypto    Physical Gold
+        Line 1: precious_metals    crypto    physical_gold
         Line 2: 10000    5000    2000
     """
-    if isinstance(file_path_or_buffer, str):
-        f = open(file_path_or_buffer, "r", encoding="utf-8")
-    else:
-        f = file_path_or_buffer
-
-    with f:
-        lines = [line.strip() for line in f.readlines() if line.strip()]
+    lines = _read_lines(file_path_or_buffer)
 
     if len(lines) < 2:
         print(f"{file_path_or_buffer} wrong format for asset data (less than 2 lines).")
-        return
+        return None
 
-    names = [n.lower().strip() for n in lines[0].split("\t")]
+    categories = [category_name(n) for n in lines[0].split("\t")]
     values = [v.strip() for v in lines[1].split("\t")]
 
+    if len(categories) != len(values):
+        print(
+            f"{file_path_or_buffer} wrong format: {len(categories)} asset categories, {len(values)} values found."
+        )
+        return None
+
     try:
         values = [float(v.replace(",", ".")) for v in values]
     except ValueError:
         print(f"{file_path_or_buffer} asset values could not be converted to float.")
+        return None
+
+    return list(zip(categories, values))
+
+
+def parse_and_save_asset(
+    file_path_or_buffer,
+    date: datetime.date,
+    portfolio=DEFAULT_PORTFOLIO,
+    update_rollups=True,
+):
+    """
+    Parses and saves asset data from text file or StringIO (see parse_assets).
+    Each header column is an asset category, so new categories need no schema change.
+    """
+    assets = parse_assets(file_path_or_buffer)
+    if assets is None:
         return
 
     session = SessionLocal()
+    added_count = 0
 
-    entry = AssetValue(
-        date=date,
-        precious_metals_tl=np.nan_to_num(values[0], nan=0.0),
-        crypto_tl=np.nan_to_num(values[1], nan=0.0),
-        physical_gold_tl=np.nan_to_num(values[2], nan=0.0),
-    )
+    for category, value in assets:
+        entry = AssetValue(
+            portfolio=portfolio,
+            category=category,
+            date=date,
+            value_tl=np.nan_to_num(value, nan=0.0),
+        )
+        session.add(entry)
 
-    session.add(entry)
-    try:
+        try:
+            session.commit()
+            added_count += 1
+        except IntegrityError:
+            session.rollback()
+            print(f"⚠️ Duplicate asset data skipped: {category} ({date})")
+
+    if added_count:
+        bump_data_version(session, portfolio)
         session.commit()
         print(f"✅ Asset data for {date} added successfully.")
-    except IntegrityError:
-        session.rollback()
-        print(f"⚠️ Duplicate asset data for {date}, skipped.")
-
     session.close()
+    if added_count and update_rollups:
+        refresh_rollups(date, date, portfolio)
+        refresh_growth_index(date, portfolio)
+
+
+def category_name(label):
+    """Normalizes an asset header: 'Precious Metals' / 'precious_metals_tl' → 'precious_metals'"""
+    name = "_".join(label.lower().split())
+    return name[: -len("_tl")] if name.endswith("_tl") else name
+
+
+def _iter_txt_files(kind, skip_dates=()):
+    """
+    Yields (date, file_path) for the legacy plain-text files in 'data_<kind>/'.
+    Dates already present in the archive are skipped.
+    """
+    for file_path in sorted(glob.glob(f"data_{kind}/**/*.txt", recursive=True)):
+        filename = os.path.basename(file_path)
+        try:
+            date_str = filename.replace(".txt", "")
+            date = datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
+        except ValueError:
+            print(f"{filename} wrong filename format. Use YYYY-MM-DD.txt")
+            continue
+        if date not in skip_dates:
+            yield date, file_path
 
 
 def load_all_data():
     """
-    Loads and saves all fund and asset data files from their respective folders.
-    - Fund data from 'data_funds/'
-    - Asset data from 'data_assets/'
+    Loads and saves all fund and asset data to the database.
+    - Compressed raw files of every portfolio are streamed from the archive
+    - Legacy plain-text files from 'data_funds/' and 'data_assets/' are
+      loaded into the default portfolio for any date that is not archived yet
     """
     init_db()
 
-    # --- Load fund data ---
-    fund_files = sorted(glob.glob("data_funds/**/*.txt", recursive=True))
-    if not fund_files:
-        print("⚠️ No fund data files found in 'data_funds/' folder.")
-    else:
-        for file_path in fund_files:
-            filename = os.path.basename(file_path)
-            try:
-                date_str = filename.replace(".txt", "")
-                date = datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
-            except ValueError:
-                print(f"{filename} wrong filename format. Use YYYY-MM-DD.txt")
-                continue
-            parse_and_save_funds(file_path, date)
-
-    # --- Load asset data ---
-    asset_files = sorted(glob.glob("data_assets/**/*.txt", recursive=True))
-    if not asset_files:
-        print("⚠️ No asset data files found in 'data_assets/' folder.")
-    else:
-        for file_path in asset_files:
-            filename = os.path.basename(file_path)
-            try:
-                date_str = filename.replace(".txt", "")
-                date = datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
-            except ValueError:
-                print(f"{filename} wrong filename format. Use YYYY-MM-DD.txt")
-                continue
-            parse_and_save_asset(file_path, date)
+    loaders = {"funds": parse_and_save_funds, "assets": parse_and_save_asset}
+    portfolios = set(archive.archived_portfolios()) | {DEFAULT_PORTFOLIO}
+    for portfolio in sorted(portfolios):
+        for kind, parse_and_save in loaders.items():
+            archived = set(archive.archived_dates(kind, portfolio))
+            legacy = (
+                _iter_txt_files(kind, skip_dates=archived)
+                if portfolio == DEFAULT_PORTFOLIO
+                else iter(())
+            )
+            # Both sources are already in date order, merge them lazily
+            sources = heapq.merge(
+                archive.iter_raw(kind, portfolio), legacy, key=lambda item: item[0]
+            )
+            loaded = 0
+            for date, source in sources:
+                parse_and_save(source, date, portfolio, update_rollups=False)
+                loaded += 1
+            if not loaded:
+                print(f"⚠️ No {kind} data found for portfolio '{portfolio}'.")
+        # Rollups and returns are rebuilt once per portfolio instead of once per day
+        rebuild_rollups(portfolio)
+        rebuild_growth_index(portfolio)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,26 @@
+"""
+Helpers shared by everything that writes results out of the app: the batch
+reports, the exports and the JSON API.
+"""
+
+import math
+import re
+
+
+def json_safe(data):
+    """
+    Returns data with every non-finite float (a % change of a zero start
+    value) replaced by None, so it can be written as strict JSON.
+    """
+    if isinstance(data, dict):
+        return {key: json_safe(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [json_safe(value) for value in data]
+    if isinstance(data, float):
+        return float(data) if math.isfinite(data) else None
+    return data
+
+
+def file_name(portfolio):
+    """For file names: keeps letters, digits, '_' and '-' of a portfolio name."""
+    return re.sub(r"[^\w-]+", "_", portfolio).strip("_") or "portfolio"
@@ -0,0 +1,254 @@
+"""
+Headless batch report engine.
+
+Runs the analysis for a list of date ranges (and portfolios) without
+Streamlit, fanning the work out over a process pool, and writes JSON, CSV
+and HTML reports. Suitable for cron, e.g.:
+
+    python report.py --last 7 30 90 --all-portfolios --format json html
+    python report.py --range 2025-10-01:2025-10-19 --portfolio default
+"""
+
+import argparse
+import datetime
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from analyze import get_all_assets_changes, get_all_funds_changes, get_top_bottom_funds
+from database import DEFAULT_PORTFOLIO, ensure_db, list_portfolios
+from outputs import file_name, json_safe
+from streaming import stream_changes
+from summary_calculator import SummaryCalculator
+
+FORMATS = ("json", "csv", "html")
+
+
+def _streamed_results(portfolio, start_date, end_date, max_memory_mb):
+    """
+    Returns (fund summaries, leaderboards, fund_result, asset_result) read
+    chunk by chunk. The results only carry what aligned_frame needs: the
+    daily fund totals and the (small) daily pivot of the asset categories.
+    """
+    funds = stream_changes(
+        "fund", start_date, end_date, portfolio, max_memory_mb=max_memory_mb
+    )
+    assets = stream_changes(
+        "asset",
+        start_date,
+        end_date,
+        portfolio,
+        max_memory_mb=max_memory_mb,
+        keep_values=True,
+    )
+    if funds is None or assets is None:
+        return None, None, None, None
+    return (
+        funds["summary"],
+        funds["leaderboards"],
+        {"total_funds": funds["total"]},
+        {"pivot": assets["pivot"]},
+    )
+
+
+def build_report(portfolio, start_date, end_date, max_memory_mb=None):
+    """
+    Computes the same figures as the Analysis page for one portfolio and range.
+    Returns (report dict, daily totals DataFrame) or (None, None) if no data exists.
+    With max_memory_mb the range is read in chunks that fit under that ceiling
+    (see streaming.py); the daily totals are then always at daily resolution.
+    """
+    if max_memory_mb:
+        fund_summaries, leaderboards, fund_result, asset_result = _streamed_results(
+            portfolio, start_date, end_date, max_memory_mb
+        )
+    else:
+        fund_result = get_all_funds_changes(start_date, end_date, portfolio=portfolio)
+        asset_result = get_all_assets_changes(
+            start_date, end_date, portfolio=portfolio
+        )
+        if fund_result is not None:
+            fund_summaries = SummaryCalculator.summarize(fund_result["pivot"])
+            leaderboards = get_top_bottom_funds(fund_result)
+    if fund_result is None or asset_result is None:
+        return None, None
+
+    combined = SummaryCalculator.aligned_frame(fund_result, asset_result)
+    summaries = SummaryCalculator.summarize(combined).rename(
+        index={"total_portfolio": "portfolio"}
+    )
+    top_pct, top_tl, bottom_pct, bottom_tl = leaderboards
+
+    report = {
+        "portfolio": portfolio,
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "summary": summaries.to_dict(orient="index"),
+        "fund_summary": fund_summaries.round(4).to_dict(orient="index"),
+        "top_funds_by_pct": top_pct.round(4).to_dict(),
+        "top_funds_by_tl": top_tl.round(4).to_dict(),
+        "bottom_funds_by_pct": bottom_pct.round(4).to_dict(),
+        "bottom_funds_by_tl": bottom_tl.round(4).to_dict(),
+    }
+    daily_total = combined[["funds", "assets", "total_portfolio"]].rename_axis("date")
+    return report, daily_total
+
+
+def _write_html(path, report, daily_total):
+    summary = pd.DataFrame(report["summary"]).T
+    fund_summary = pd.DataFrame(report["fund_summary"]).T
+    leaderboards = pd.DataFrame(
+        {
+            name: pd.Series(report[name])
+            for name in (
+                "top_funds_by_pct",
+                "top_funds_by_tl",
+                "bottom_funds_by_pct",
+                "bottom_funds_by_tl",
+            )
+        }
+    )
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(
+            f"<html><head><meta charset='utf-8'><title>{report['portfolio']} "
+            f"{report['start_date']} - {report['end_date']}</title></head><body>\n"
+            f"<h1>Portfolio '{report['portfolio']}': "
+            f"{report['start_date']} - {report['end_date']}</h1>\n"
+            "<h2>Summary</h2>\n"
+            f"{summary.round(2).to_html()}\n"
+            "<h2>Funds</h2>\n"
+            f"{fund_summary.round(2).to_html()}\n"
+            "<h2>Top / Bottom Funds</h2>\n"
+            f"{leaderboards.round(2).to_html()}\n"
+            "<h2>Daily Totals</h2>\n"
+            f"{daily_total.round(2).to_html()}\n"
+            "</body></html>\n"
+        )
+
+
+def run_job(job):
+    """
+    Builds and writes the report of a single (portfolio, start, end) job.
+    Runs in a worker process, so it only receives and returns plain values.
+    """
+    portfolio, start_date, end_date, formats, out_dir, max_memory_mb = job
+    ensure_db()  # workers may be fresh processes
+    report, daily_total = build_report(portfolio, start_date, end_date, max_memory_mb)
+    if report is None:
+        return portfolio, start_date, end_date, []
+
+    base = os.path.join(out_dir, f"{file_name(portfolio)}_{start_date}_{end_date}")
+    written = []
+    if "json" in formats:
+        with open(f"{base}.json", "w", encoding="utf-8") as f:
+            json.dump(
+                json_safe(report), f, indent=2, ensure_ascii=False, allow_nan=False
+            )
+        written.append(f"{base}.json")
+    if "csv" in formats:
+        daily_total.to_csv(f"{base}.csv")
+        written.append(f"{base}.csv")
+    if "html" in formats:
+        _write_html(f"{base}.html", report, daily_total)
+        written.append(f"{base}.html")
+    return portfolio, start_date, end_date, written
+
+
+def parse_range(value):
+    """Parses 'YYYY-MM-DD:YYYY-MM-DD' into a (start, end) pair of dates."""
+    try:
+        start, end = value.split(":")
+        start_date = datetime.date.fromisoformat(start)
+        end_date = datetime.date.fromisoformat(end)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"{value} wrong format. Use YYYY-MM-DD:YYYY-MM-DD"
+        )
+    if start_date > end_date:
+        raise argparse.ArgumentTypeError(f"{value}: start date is after end date.")
+    return start_date, end_date
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate portfolio reports.")
+    parser.add_argument(
+        "--range",
+        dest="ranges",
+        type=parse_range,
+        action="append",
+        default=[],
+        help="Date range as YYYY-MM-DD:YYYY-MM-DD (can be repeated)",
+    )
+    parser.add_argument(
+        "--last",
+        type=int,
+        nargs="+",
+        default=[],
+        help="Ranges of the last N days ending today, e.g. --last 7 30",
+    )
+    parser.add_argument(
+        "--portfolio",
+        dest="portfolios",
+        action="append",
+        default=[],
+        help="Portfolio name (can be repeated, default: 'default')",
+    )
+    parser.add_argument(
+        "--all-portfolios", action="store_true", help="Report on every portfolio"
+    )
+    parser.add_argument(
+        "--format", nargs="+", choices=FORMATS, default=["json"], dest="formats"
+    )
+    parser.add_argument("--out", default="reports", help="Output directory")
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Number of worker processes"
+    )
+    parser.add_argument(
+        "--max-memory-mb",
+        type=int,
+        default=None,
+        help="Read long ranges in chunks that fit under this memory ceiling",
+    )
+    args = parser.parse_args(argv)
+
+    today = datetime.date.today()
+    ranges = args.ranges + [
+        (today - datetime.timedelta(days=days), today) for days in args.last
+    ]
+    if not ranges:
+        parser.error("at least one --range or --last is required")
+
+    # Migrate once here, before the workers start
+    ensure_db()
+    if args.all_portfolios:
+        portfolios = list_portfolios()
+    else:
+        portfolios = args.portfolios or [DEFAULT_PORTFOLIO]
+
+    os.makedirs(args.out, exist_ok=True)
+    jobs = [
+        (
+            portfolio,
+            start_date,
+            end_date,
+            tuple(args.formats),
+            args.out,
+            args.max_memory_mb,
+        )
+        for portfolio in portfolios
+        for start_date, end_date in ranges
+    ]
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for portfolio, start_date, end_date, written in executor.map(run_job, jobs):
+            label = f"{portfolio} {start_date} - {end_date}"
+            if written:
+                print(f"✅ {label}: {', '.join(written)}")
+            else:
+                print(f"⚠️ {label}: no data, skipped.")
+
+
+if __name__ == "__main__":
+    main()
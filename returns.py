@@ -0,0 +1,464 @@
+"""
+Cash-flow adjusted returns of funds, asset categories and the whole portfolio.
+
+Deposits (positive) and withdrawals (negative) are recorded in the cash_flows
+table. A flow is assumed to happen at the end of its day (flows on days
+without values count on the next day with values), so the return of a day is
+
+    r_t = (V_t - F_t) / V_{t-1} - 1
+
+and money moved in or out is never counted as a gain or loss. A series that
+is not held on both the day and the day before is flat on that day.
+
+The growth_index table stores the running product of (1 + r_t) of every
+series and of the portfolio total (kind "portfolio", series "total"):
+- the time-weighted return of a range is the ratio of the levels at its end
+  and start, two indexed lookups per series however long the history is
+- new days only extend the index from the last stored day, backdated values
+  or flows recompute it from the earliest changed day on
+- the money-weighted return (internal rate of return of the start value, the
+  flows and the end value) is solved for all series at once
+
+    python returns.py --start 2025-01-01 --end 2025-10-19
+    python returns.py --rebuild
+"""
+
+import argparse
+import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, insert, text
+
+from analyze import KINDS
+from cache import portfolio_cached
+from database import (
+    DEFAULT_PORTFOLIO,
+    AssetValue,
+    CashFlow,
+    FundValue,
+    GrowthIndex,
+    SessionLocal,
+    bump_data_version,
+    ensure_db,
+)
+
+PORTFOLIO_KIND = "portfolio"
+TOTAL_SERIES = "total"
+
+NEWTON_ITERATIONS = 100
+NEWTON_TOLERANCE = 1e-12
+
+RETURN_COLUMNS = [
+    "kind",
+    "series",
+    "first_date",
+    "last_date",
+    "start_value",
+    "net_flows",
+    "end_value",
+    "gain_tl",
+    "twr_pct",
+    "mwr_pct",
+    "mwr_annual_pct",
+]
+
+# First and last growth level of every series in a date range
+_SQL_LEVELS = """
+WITH bounds AS (
+    SELECT kind, series, MIN(date) AS first_date, MAX(date) AS last_date
+    FROM growth_index
+    WHERE portfolio = :portfolio AND date BETWEEN :start AND :end
+    GROUP BY kind, series
+)
+SELECT b.kind, b.series, b.first_date, b.last_date,
+       s.level AS start_level, e.level AS end_level
+FROM bounds AS b
+JOIN growth_index AS s
+  ON s.portfolio = :portfolio AND s.kind = b.kind
+ AND s.series = b.series AND s.date = b.first_date
+JOIN growth_index AS e
+  ON e.portfolio = :portfolio AND e.kind = b.kind
+ AND e.series = b.series AND e.date = b.last_date
+"""
+
+
+def _value_rows(session, portfolio, start_date=None, dates=None):
+    """Returns fund and asset values as a long DataFrame (kind, series, date, value)."""
+    frames = []
+    for kind, model in (("fund", FundValue), ("asset", AssetValue)):
+        query = session.query(
+            getattr(model, KINDS[kind]), model.date, model.value_tl
+        ).filter(model.portfolio == portfolio)
+        if start_date is not None:
+            query = query.filter(model.date >= start_date)
+        if dates is not None:
+            query = query.filter(model.date.in_(dates))
+        rows = query.all()
+        if rows:
+            frame = pd.DataFrame(rows, columns=["series", "date", "value"])
+            frame["kind"] = kind
+            frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=["series", "date", "value", "kind"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def _flow_rows(session, portfolio, after=None, until=None):
+    """Returns the cash flows after / until the given dates as a long DataFrame."""
+    query = session.query(
+        CashFlow.kind, CashFlow.series, CashFlow.date, CashFlow.amount
+    ).filter(CashFlow.portfolio == portfolio)
+    if after is not None:
+        query = query.filter(CashFlow.date > after)
+    if until is not None:
+        query = query.filter(CashFlow.date <= until)
+    return pd.DataFrame(query.all(), columns=["kind", "series", "date", "amount"])
+
+
+def flow_returns(values, flows):
+    """
+    Returns the daily returns of a value pivot (rows = dates, columns = series,
+    0 = not held) net of a flow pivot of the same shape, and the daily returns
+    of their total. The total only counts series held on both days, so that a
+    position bought or sold without a recorded flow is not taken as a gain or
+    loss. The first row has no previous day and is 0.
+    """
+    v = values.to_numpy()
+    f = flows.to_numpy()
+    previous = np.vstack([np.zeros((1, v.shape[1])), v[:-1]])
+    held = (v > 0) & (previous > 0)
+    invested = np.where(held, previous, 0.0).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = np.where(held, (v - f) / previous - 1, 0.0)
+        total = np.where(held, v - f, 0.0).sum(axis=1) / invested - 1
+    return (
+        pd.DataFrame(r, index=values.index, columns=values.columns),
+        pd.Series(np.where(invested > 0, total, 0.0), index=values.index),
+    )
+
+
+def _update_growth_index(portfolio, from_date=None):
+    """
+    Recomputes the growth index of a portfolio from from_date on (whole
+    history if None), continuing from the stored levels of the day before.
+    """
+    session = SessionLocal()
+    seed_date = None
+    if from_date is not None:
+        seed_date = (
+            session.query(func.max(GrowthIndex.date))
+            .filter(GrowthIndex.portfolio == portfolio, GrowthIndex.date < from_date)
+            .scalar()
+        )
+    seed = pd.Series(dtype=float)
+    if seed_date is not None:
+        rows = session.query(
+            GrowthIndex.kind, GrowthIndex.series, GrowthIndex.level
+        ).filter(GrowthIndex.portfolio == portfolio, GrowthIndex.date == seed_date)
+        seed = pd.DataFrame(rows.all(), columns=["kind", "series", "level"])
+        seed = seed.set_index(["kind", "series"])["level"]
+
+    delete = session.query(GrowthIndex).filter(GrowthIndex.portfolio == portfolio)
+    if seed_date is not None:
+        delete = delete.filter(GrowthIndex.date > seed_date)
+    delete.delete(synchronize_session=False)
+
+    values = _value_rows(session, portfolio, seed_date)
+    if not values.empty:
+        pivot = values.pivot_table(
+            index="date", columns=["kind", "series"], values="value", aggfunc="last"
+        ).sort_index()
+        if seed_date is not None:
+            pivot = pivot.reindex(columns=pivot.columns.union(seed.index))
+        dates = pivot.index
+
+        # Flows count on the first day with values on or after their date
+        flows = _flow_rows(session, portfolio, after=seed_date)
+        flows = flows[flows["date"] <= dates[-1]]
+        flows = flows.assign(date=dates[np.searchsorted(dates, flows["date"])])
+        series_flows = (
+            flows.groupby(["date", "kind", "series"])["amount"]
+            .sum()
+            .unstack(["kind", "series"])
+            .reindex(index=dates, columns=pivot.columns)
+            .fillna(0)
+        )
+
+        # Series are stored from their first value on, the total always
+        appeared = pivot.notna().cummax()
+        appeared.loc[:, pivot.columns.isin(seed.index)] = True
+        series_returns, total_returns = flow_returns(pivot.fillna(0), series_flows)
+        total = (PORTFOLIO_KIND, TOTAL_SERIES)
+        series_returns[total] = total_returns
+        appeared[total] = True
+
+        growth = (1 + series_returns).cumprod()
+        start = seed.reindex(growth.columns).fillna(1.0)
+        levels = growth * start.to_numpy()
+        if seed_date is not None:
+            levels, appeared = levels.iloc[1:], appeared.iloc[1:]
+        levels = levels.where(appeared).stack([0, 1]).rename("level").reset_index()
+        if not levels.empty:
+            levels["portfolio"] = portfolio
+            session.execute(insert(GrowthIndex), levels.to_dict("records"))
+
+    bump_data_version(session, portfolio)
+    session.commit()
+    session.close()
+
+
+def refresh_growth_index(from_date, portfolio=DEFAULT_PORTFOLIO):
+    """Updates the growth index after values or flows on or after from_date changed."""
+    _update_growth_index(portfolio, from_date)
+
+
+def rebuild_growth_index(portfolio=DEFAULT_PORTFOLIO):
+    """Recomputes the whole growth index of a portfolio."""
+    _update_growth_index(portfolio)
+    print(f"✅ Growth index rebuilt for portfolio '{portfolio}'.")
+
+
+def catch_up_growth_index(portfolio=DEFAULT_PORTFOLIO):
+    """Extends the growth index to the last day with values, if it lags behind."""
+    session = SessionLocal()
+    indexed = (
+        session.query(func.max(GrowthIndex.date))
+        .filter(GrowthIndex.portfolio == portfolio)
+        .scalar()
+    )
+    latest = [
+        session.query(func.max(model.date))
+        .filter(model.portfolio == portfolio)
+        .scalar()
+        for model in (FundValue, AssetValue)
+    ]
+    session.close()
+    latest = max((date for date in latest if date is not None), default=None)
+    if latest is None or (indexed is not None and indexed >= latest):
+        return
+    if indexed is None:
+        _update_growth_index(portfolio)
+    else:
+        _update_growth_index(portfolio, indexed + datetime.timedelta(days=1))
+
+
+def add_cash_flow(date, kind, series, amount, portfolio=DEFAULT_PORTFOLIO, note=None):
+    """
+    Records a deposit (positive amount) or withdrawal (negative amount) of a
+    fund or asset category and updates the growth index from its date on.
+    """
+    session = SessionLocal()
+    session.add(
+        CashFlow(
+            portfolio=portfolio,
+            kind=kind,
+            series=series,
+            date=date,
+            amount=amount,
+            note=note,
+        )
+    )
+    bump_data_version(session, portfolio)
+    session.commit()
+    session.close()
+    refresh_growth_index(date, portfolio)
+
+
+def delete_cash_flow(flow_id, portfolio=DEFAULT_PORTFOLIO):
+    """Deletes a recorded flow and updates the growth index from its date on."""
+    session = SessionLocal()
+    flow = session.get(CashFlow, flow_id)
+    if flow is None or flow.portfolio != portfolio:
+        session.close()
+        print(f"⚠️ Cash flow {flow_id} not found.")
+        return
+    date = flow.date
+    session.delete(flow)
+    bump_data_version(session, portfolio)
+    session.commit()
+    session.close()
+    refresh_growth_index(date, portfolio)
+
+
+def list_cash_flows(portfolio=DEFAULT_PORTFOLIO, start_date=None, end_date=None):
+    """Returns the recorded flows of a portfolio, optionally in a date range."""
+    session = SessionLocal()
+    query = session.query(
+        CashFlow.id,
+        CashFlow.date,
+        CashFlow.kind,
+        CashFlow.series,
+        CashFlow.amount,
+        CashFlow.note,
+    ).filter(CashFlow.portfolio == portfolio)
+    if start_date is not None:
+        query = query.filter(CashFlow.date >= start_date)
+    if end_date is not None:
+        query = query.filter(CashFlow.date <= end_date)
+    flows = pd.DataFrame(
+        query.order_by(CashFlow.date, CashFlow.id).all(),
+        columns=["id", "date", "kind", "series", "amount", "note"],
+    )
+    session.close()
+    return flows
+
+
+def internal_rates(amounts, days):
+    """
+    Solves sum(amounts * (1 + x) ** -days) = 0 for every row at once with
+    Newton's method and returns the daily rates x. amounts are the cash flows
+    of the investor (paid in < 0, received > 0), days their day offsets.
+    Rows without both signs, or that do not converge, are NaN.
+    """
+    rate = np.zeros(amounts.shape[0])
+    with np.errstate(all="ignore"):
+        for _ in range(NEWTON_ITERATIONS):
+            discount = (1 + rate)[:, None] ** -days
+            npv = (amounts * discount).sum(axis=1)
+            slope = (-days * amounts * discount).sum(axis=1) / (1 + rate)
+            step = npv / slope
+            # Keep 1 + rate positive, halving the distance to -100% at most
+            rate = np.maximum(rate - step, (rate - 1) / 2)
+            if np.nanmax(np.abs(step), initial=0) < NEWTON_TOLERANCE:
+                break
+        discount = (1 + rate)[:, None] ** -days
+        scale = np.abs(amounts).sum(axis=1)
+        residual = np.abs((amounts * discount).sum(axis=1)) / scale
+    valid = (amounts < 0).any(axis=1) & (amounts > 0).any(axis=1) & (residual < 1e-8)
+    return np.where(valid, rate, np.nan)
+
+
+def _money_weighted(frame, flows):
+    """
+    Returns the daily internal rate, the length in days and the net flows of
+    every row of frame (kind, series, first_date, last_date, start_value,
+    end_value). Only flows after first_date up to last_date are counted.
+    """
+    first = pd.to_datetime(frame["first_date"]).to_numpy()
+    last = pd.to_datetime(frame["last_date"]).to_numpy()
+    position = pd.Series(
+        np.arange(len(frame)), index=pd.MultiIndex.from_frame(frame[["kind", "series"]])
+    )
+    rows = position.reindex(pd.MultiIndex.from_frame(flows[["kind", "series"]]))
+    known = rows.notna().to_numpy()
+    rows = rows.to_numpy()[known].astype(int)
+    dates = pd.to_datetime(flows["date"]).to_numpy()[known]
+    amounts = flows["amount"].to_numpy()[known]
+    counted = (dates > first[rows]) & (dates <= last[rows])
+    rows, dates, amounts = rows[counted], dates[counted], amounts[counted]
+
+    # One column per distinct day offset, shared by all series
+    day = np.timedelta64(1, "D")
+    offsets = (dates - first[rows]) // day
+    horizon = (last - first) // day
+    grid = np.unique(np.concatenate([[0], offsets, horizon]))
+    cash = np.zeros((len(frame), len(grid)))
+    cash[:, 0] -= frame["start_value"].to_numpy()
+    np.add.at(cash, (rows, np.searchsorted(grid, offsets)), -amounts)
+    end = np.searchsorted(grid, horizon)
+    cash[np.arange(len(frame)), end] += frame["end_value"].to_numpy()
+    net_flows = np.bincount(rows, weights=amounts, minlength=len(frame))
+    return internal_rates(cash, grid.astype(float)), horizon, net_flows
+
+
+@portfolio_cached
+def _get_returns(start_date, end_date, portfolio=DEFAULT_PORTFOLIO):
+    session = SessionLocal()
+    levels = pd.DataFrame(
+        session.execute(
+            text(_SQL_LEVELS),
+            {
+                "portfolio": portfolio,
+                "start": start_date.isoformat(),
+                "end": end_date.isoformat(),
+            },
+        ).all(),
+        columns=[
+            "kind", "series", "first_date", "last_date", "start_level", "end_level"
+        ],
+    )
+    if levels.empty:
+        session.close()
+        return None
+    for column in ("first_date", "last_date"):
+        levels[column] = pd.to_datetime(levels[column]).dt.date
+
+    edge_dates = set(levels["first_date"]) | set(levels["last_date"])
+    values = _value_rows(session, portfolio, dates=edge_dates)
+    flows = _flow_rows(
+        session, portfolio, after=min(edge_dates), until=max(edge_dates)
+    )
+    session.close()
+
+    # Series values on their first and last day, the total is the sum of all
+    totals = values.groupby("date")["value"].sum()
+    values = values.set_index(["kind", "series", "date"])["value"]
+    total_rows = levels["kind"] == PORTFOLIO_KIND
+    for edge, column in (("first_date", "start_value"), ("last_date", "end_value")):
+        keys = pd.MultiIndex.from_frame(levels[["kind", "series", edge]])
+        levels[column] = values.reindex(keys).fillna(0).to_numpy()
+        levels.loc[total_rows, column] = (
+            totals.reindex(levels.loc[total_rows, edge]).fillna(0).to_numpy()
+        )
+    total_flows = flows.assign(kind=PORTFOLIO_KIND, series=TOTAL_SERIES)
+    flows = pd.concat([flows, total_flows], ignore_index=True)
+
+    daily_rate, horizon, levels["net_flows"] = _money_weighted(levels, flows)
+    levels["gain_tl"] = (
+        levels["end_value"] - levels["start_value"] - levels["net_flows"]
+    )
+    levels["twr_pct"] = (levels["end_level"] / levels["start_level"] - 1) * 100
+    levels["mwr_pct"] = ((1 + daily_rate) ** horizon - 1) * 100
+    levels["mwr_annual_pct"] = ((1 + daily_rate) ** 365 - 1) * 100
+    order = levels["kind"].map({PORTFOLIO_KIND: 0, "fund": 1, "asset": 2})
+    levels = levels.assign(order=order).sort_values(["order", "series"])
+    return levels[RETURN_COLUMNS].reset_index(drop=True)
+
+
+def get_returns(start_date, end_date, portfolio=DEFAULT_PORTFOLIO):
+    """
+    Returns the cash-flow adjusted returns of every fund, asset category and
+    the portfolio total ("portfolio" / "total", first row) in a date range as
+    a DataFrame with RETURN_COLUMNS, or None if there is no data:
+    - start_value / end_value: values on the first and last day of the series
+    - net_flows: flows after the first day up to the last day
+    - gain_tl: change in value that is not explained by flows
+    - twr_pct: time-weighted return (independent of the timing of flows)
+    - mwr_pct / mwr_annual_pct: money-weighted return over the range / per year
+    """
+    catch_up_growth_index(portfolio)
+    return _get_returns(start_date, end_date, portfolio=portfolio)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cash-flow adjusted returns.")
+    parser.add_argument("--portfolio", default=DEFAULT_PORTFOLIO)
+    parser.add_argument("--start", type=datetime.date.fromisoformat, default=None)
+    parser.add_argument(
+        "--end", type=datetime.date.fromisoformat, default=datetime.date.today()
+    )
+    parser.add_argument(
+        "--rebuild", action="store_true", help="Recompute the whole growth index"
+    )
+    parser.add_argument("--out", help="Write the returns to this CSV file")
+    args = parser.parse_args(argv)
+
+    ensure_db()
+    if args.rebuild:
+        rebuild_growth_index(args.portfolio)
+    start = args.start or datetime.date.min
+    if start > args.end:
+        parser.error("start date is after end date")
+    returns = get_returns(start, args.end, portfolio=args.portfolio)
+    if returns is None:
+        print("❌ No data available for the selected date range.")
+        return
+    print(returns.to_string(index=False, float_format=lambda v: f"{v:,.4f}"))
+    if args.out:
+        returns.to_csv(args.out, index=False)
+        print(f"✅ Returns written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Maintains weekly and monthly rollups of fund and asset values.
+
+Long date ranges are analyzed on these rollups instead of the daily rows,
+so their cost grows with the number of periods rather than days x funds.
+Rollups are refreshed incrementally for the periods touched by an ingest or
+delete; rebuild_rollups() recomputes a whole portfolio.
+"""
+
+import datetime
+
+import pandas as pd
+from sqlalchemy import and_, func, insert
+
+from database import (
+    DEFAULT_PORTFOLIO,
+    AssetValue,
+    FundValue,
+    SessionLocal,
+    ValueRollup,
+    bump_data_version,
+    list_portfolios,
+)
+
+PERIODS = ("week", "month")
+
+# Daily resolution is used as long as a chart would show at most this many points
+MAX_CHART_POINTS = 366
+
+
+def choose_resolution(start_date, end_date):
+    """Returns the resolution ("day", "week" or "month") that fits a date range."""
+    days = (end_date - start_date).days + 1
+    if days <= MAX_CHART_POINTS:
+        return "day"
+    if days / 7 <= MAX_CHART_POINTS:
+        return "week"
+    return "month"
+
+
+def period_start(date, period):
+    """Returns the first day of the week (Monday) or month containing date."""
+    if period == "week":
+        return date - datetime.timedelta(days=date.weekday())
+    return date.replace(day=1)
+
+
+def period_end(date, period):
+    """Returns the last day of the week (Sunday) or month containing date."""
+    if period == "week":
+        return period_start(date, period) + datetime.timedelta(days=6)
+    next_month = (date.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return next_month - datetime.timedelta(days=1)
+
+
+def _daily_rows(session, portfolio, start_date, end_date, kind=None, dates=None):
+    """
+    Returns daily values as a long DataFrame with columns kind, series, date, value.
+    kind: "fund", "asset" or None for both
+    dates: optional collection of dates to restrict the rows to
+    """
+    frames = []
+    if kind in (None, "fund"):
+        query = session.query(
+            FundValue.fund_code, FundValue.date, FundValue.value_tl
+        ).filter(
+            and_(
+                FundValue.portfolio == portfolio,
+                FundValue.date >= start_date,
+                FundValue.date <= end_date,
+            )
+        )
+        if dates is not None:
+            query = query.filter(FundValue.date.in_(dates))
+        funds = pd.DataFrame(query.all(), columns=["series", "date", "value"])
+        funds["kind"] = "fund"
+        frames.append(funds)
+    if kind in (None, "asset"):
+        query = session.query(
+            AssetValue.category, AssetValue.date, AssetValue.value_tl
+        ).filter(
+            and_(
+                AssetValue.portfolio == portfolio,
+                AssetValue.date >= start_date,
+                AssetValue.date <= end_date,
+            )
+        )
+        if dates is not None:
+            query = query.filter(AssetValue.date.in_(dates))
+        assets = pd.DataFrame(query.all(), columns=["series", "date", "value"])
+        assets["kind"] = "asset"
+        frames.append(assets)
+    return pd.concat(frames, ignore_index=True)[["kind", "series", "date", "value"]]
+
+
+def _aggregate(daily, period):
+    """Aggregates long daily rows into one record per (kind, series, period)."""
+    if daily.empty:
+        return []
+    dates = pd.to_datetime(daily["date"])
+    if period == "week":
+        starts = dates - pd.to_timedelta(dates.dt.weekday, unit="D")
+    else:
+        starts = dates.dt.to_period("M").dt.start_time
+    daily = daily.assign(period_start=starts.dt.date).sort_values("date")
+
+    rollup = (
+        daily.groupby(["kind", "series", "period_start"])
+        .agg(
+            first_date=("date", "first"),
+            last_date=("date", "last"),
+            first_value=("value", "first"),
+            last_value=("value", "last"),
+            min_value=("value", "min"),
+            max_value=("value", "max"),
+            mean_value=("value", "mean"),
+            day_count=("value", "size"),
+        )
+        .reset_index()
+    )
+    rollup["change_tl"] = rollup["last_value"] - rollup["first_value"]
+    rollup["period"] = period
+    return rollup.to_dict("records")
+
+
+def refresh_rollups(start_date, end_date, portfolio=DEFAULT_PORTFOLIO):
+    """
+    Recomputes the rollups of every week and month that overlaps the given
+    date range, after days in it were ingested or deleted.
+    """
+    affected = {}
+    for period in PERIODS:
+        starts = set()
+        date = period_start(start_date, period)
+        while date <= end_date:
+            starts.add(date)
+            date = period_end(date, period) + datetime.timedelta(days=1)
+        affected[period] = starts
+
+    load_start = min(min(starts) for starts in affected.values())
+    load_end = max(period_end(max(s), p) for p, s in affected.items())
+
+    session = SessionLocal()
+    daily = _daily_rows(session, portfolio, load_start, load_end)
+    for period, starts in affected.items():
+        session.query(ValueRollup).filter(
+            ValueRollup.portfolio == portfolio,
+            ValueRollup.period == period,
+            ValueRollup.period_start.in_(starts),
+        ).delete(synchronize_session=False)
+        records = [
+            dict(record, portfolio=portfolio)
+            for record in _aggregate(daily, period)
+            if record["period_start"] in starts
+        ]
+        if records:
+            session.execute(insert(ValueRollup), records)
+    bump_data_version(session, portfolio)
+    session.commit()
+    session.close()
+
+
+def rebuild_rollups(portfolio=DEFAULT_PORTFOLIO):
+    """Recomputes all rollups of a portfolio from its daily values."""
+    session = SessionLocal()
+    session.query(ValueRollup).filter(ValueRollup.portfolio == portfolio).delete(
+        synchronize_session=False
+    )
+    daily = _daily_rows(session, portfolio, datetime.date.min, datetime.date.max)
+    for period in PERIODS:
+        records = [
+            dict(record, portfolio=portfolio) for record in _aggregate(daily, period)
+        ]
+        if records:
+            session.execute(insert(ValueRollup), records)
+    bump_data_version(session, portfolio)
+    session.commit()
+    session.close()
+    print(f"✅ Rollups rebuilt for portfolio '{portfolio}'.")
+
+
+def rebuild_missing_rollups():
+    """Builds rollups for portfolios that have daily values but no rollups yet."""
+    session = SessionLocal()
+    with_rollups = {
+        row[0] for row in session.query(ValueRollup.portfolio).distinct()
+    }
+    has_data = session.query(FundValue.id).first() or session.query(
+        AssetValue.id
+    ).first()
+    session.close()
+    if not has_data:
+        return
+    for portfolio in list_portfolios():
+        if portfolio not in with_rollups:
+            rebuild_rollups(portfolio)
+
+
+def get_rollup_pivot(
+    kind, start_date, end_date, period, portfolio=DEFAULT_PORTFOLIO
+):
+    """
+    Returns a pivot (rows = dates, columns = series) at weekly or monthly
+    resolution. The first and last rows are the exact daily values at the
+    first and last available dates of the range; rows in between are the
+    closing values of each period. Returns None if there is no data.
+    """
+    model = FundValue if kind == "fund" else AssetValue
+    session = SessionLocal()
+    first_date, last_date = (
+        session.query(func.min(model.date), func.max(model.date))
+        .filter(
+            and_(
+                model.portfolio == portfolio,
+                model.date >= start_date,
+                model.date <= end_date,
+            )
+        )
+        .one()
+    )
+    if first_date is None:
+        session.close()
+        return None
+
+    edges = _daily_rows(
+        session, portfolio, first_date, last_date, kind, dates=[first_date, last_date]
+    )
+    closes = session.query(
+        ValueRollup.series, ValueRollup.last_date, ValueRollup.last_value
+    ).filter(
+        and_(
+            ValueRollup.portfolio == portfolio,
+            ValueRollup.kind == kind,
+            ValueRollup.period == period,
+            ValueRollup.last_date > first_date,
+            ValueRollup.last_date < last_date,
+        )
+    )
+    closes = pd.DataFrame(closes.all(), columns=["series", "date", "value"])
+    session.close()
+
+    # A fund may close a period earlier than others, so all closes of a period
+    # are placed on its last day. Closes of the final period are dropped: the
+    # last row holds only the daily values of last_date, so a fund sold within
+    # that period ends at 0 as in the daily pivot.
+    closes["date"] = [period_end(date, period) for date in closes["date"]]
+    closes = closes[closes["date"] < last_date]
+    # Edge rows come last so their exact daily values win on the same date
+    rows = edges[["series", "date", "value"]]
+    if not closes.empty:
+        rows = pd.concat([closes, rows], ignore_index=True)
+    pivot = (
+        rows.pivot_table(index="date", columns="series", values="value", aggfunc="last")
+        .sort_index()
+        .fillna(0)
+    )
+    pivot.columns.name = "fund_code" if kind == "fund" else "category"
+    return pivot
@@ -0,0 +1,126 @@
+"""
+Monte Carlo what-if projections over historical returns.
+
+Future paths are built by bootstrapping whole historical days (the returns of
+all funds and asset categories on the same day are drawn together, so their
+co-movement is kept) and applying them to a portfolio that is rebalanced to
+fixed weights every day. Paths are simulated in shards of SHARD_SIZE; each
+shard gets its own child of one SeedSequence, so a seed gives the same result
+whether the shards run in one process or in a process pool.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from analyze import get_all_changes
+from correlation import daily_returns
+from database import DEFAULT_PORTFOLIO
+
+SHARD_SIZE = 10_000
+
+# Simulations with more paths than this run their shards in a process pool
+PARALLEL_MIN_PATHS = 20_000
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Number of points per path kept for the percentile bands
+BAND_POINTS = 100
+
+
+def historical_returns(start_date, end_date, portfolio=DEFAULT_PORTFOLIO):
+    """
+    Returns (daily returns, last values) of all funds and asset categories in
+    the range: a DataFrame with one row per day and one column per series, and
+    a Series with each series' value on the last day. Only days with both fund
+    and asset data are used. Returns (None, None) if there are not enough data.
+    """
+    fund_result, asset_result = get_all_changes(
+        start_date, end_date, portfolio=portfolio, resolution="day"
+    )
+    pivots = [r["pivot"] for r in (fund_result, asset_result) if r is not None]
+    if not pivots:
+        return None, None
+    values = pd.concat(pivots, axis=1, join="inner")
+    values.columns.name = None
+    if len(values) < 2:
+        return None, None
+    return daily_returns(values), values.iloc[-1]
+
+
+def simulate_shard(log_returns, paths, horizon, checkpoints, seed, block=1):
+    """
+    Simulates paths of a portfolio whose daily log returns are drawn from
+    log_returns and returns the portfolio value (start = 1) at each checkpoint
+    day as a (paths, len(checkpoints)) float32 array.
+    block > 1 draws runs of consecutive days to keep short-term autocorrelation.
+    """
+    rng = np.random.default_rng(seed)
+    days = len(log_returns)
+    blocks = -(-horizon // block)
+    starts = rng.integers(0, days - block + 1, size=(paths, blocks))
+    index = (starts[:, :, None] + np.arange(block)).reshape(paths, -1)[:, :horizon]
+    growth = np.cumsum(log_returns[index], axis=1)
+    return np.exp(growth[:, checkpoints - 1]).astype(np.float32)
+
+
+def simulate(
+    returns,
+    weights,
+    horizon=252,
+    paths=10_000,
+    seed=None,
+    block=1,
+    workers=None,
+):
+    """
+    Projects a constantly rebalanced portfolio over horizon days.
+    returns: DataFrame of historical daily returns (rows = days, columns = series)
+    weights: Series of target weights per series (normalized to sum to 1)
+    Returns a dict with the percentile bands of the portfolio value (start = 1)
+    by day, the final values of all paths, the probability of loss and the seed.
+    """
+    weights = weights.reindex(returns.columns).fillna(0).to_numpy(dtype=float)
+    if not np.isfinite(weights).all() or (weights < 0).any():
+        raise ValueError("Weights must be finite and not negative.")
+    if weights.sum() <= 0:
+        raise ValueError("At least one weight must be positive.")
+    weights = weights / weights.sum()
+    block = max(1, min(block, len(returns)))
+
+    # Daily rebalancing makes each historical day a single portfolio return
+    log_returns = np.log1p(returns.to_numpy() @ weights)
+    checkpoints = np.unique(np.linspace(1, horizon, BAND_POINTS).round().astype(int))
+
+    seed_sequence = np.random.SeedSequence(seed)
+    shard_sizes = [SHARD_SIZE] * (paths // SHARD_SIZE)
+    if paths % SHARD_SIZE:
+        shard_sizes.append(paths % SHARD_SIZE)
+    seeds = seed_sequence.spawn(len(shard_sizes))
+    jobs = [
+        (log_returns, size, horizon, checkpoints, shard_seed, block)
+        for size, shard_seed in zip(shard_sizes, seeds)
+    ]
+    if paths > PARALLEL_MIN_PATHS and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            shards = list(executor.map(simulate_shard, *zip(*jobs)))
+    else:
+        shards = [simulate_shard(*job) for job in jobs]
+    values = np.concatenate(shards)
+
+    bands = pd.DataFrame(
+        np.percentile(values, PERCENTILES, axis=0).T,
+        index=pd.Index(checkpoints, name="day"),
+        columns=[f"p{p}" for p in PERCENTILES],
+    )
+    final = values[:, -1]
+    return {
+        "bands": pd.concat(
+            [pd.DataFrame([[1.0] * len(PERCENTILES)], columns=bands.columns), bands]
+        ).rename_axis("day"),
+        "final": final,
+        "probability_of_loss": float((final < 1).mean()),
+        "expected_value": float(final.mean()),
+        "seed": seed_sequence.entropy,
+    }
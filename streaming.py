@@ -0,0 +1,95 @@
+"""
+Memory-bounded analysis of very long date ranges.
+
+Instead of building the whole pivot and its change frames at once, the range
+is walked in chunks (see analyze.iter_change_chunks) and only running results
+are kept: the first and last values of every series, the per-day totals and
+their changes. The chunk length is the longest of a month, a week or a day
+whose estimated working set fits under the memory ceiling. The results equal
+those of the in-memory path at daily resolution.
+"""
+
+import pandas as pd
+
+from analyze import (
+    get_top_bottom_funds,
+    iter_change_chunks,
+    list_series,
+    row_totals,
+    value_changes,
+)
+from database import DEFAULT_PORTFOLIO
+from summary_calculator import SummaryCalculator
+
+DEFAULT_MAX_MEMORY_MB = 64
+
+# Rough bytes per (day, series) while a chunk is processed: the row objects
+# read from the database, the long frame, the pivot and its change frames
+BYTES_PER_VALUE = 400
+
+CHUNK_DAYS = {"month": 31, "week": 7, "day": 1}
+
+
+def choose_chunk(series_count, max_memory_mb=DEFAULT_MAX_MEMORY_MB):
+    """Returns the longest chunk period whose working set fits the ceiling."""
+    budget = max_memory_mb * 1024 * 1024
+    for period, days in CHUNK_DAYS.items():
+        if days * series_count * BYTES_PER_VALUE <= budget:
+            return period
+    return "day"
+
+
+def stream_changes(
+    kind,
+    start_date,
+    end_date,
+    portfolio=DEFAULT_PORTFOLIO,
+    max_memory_mb=DEFAULT_MAX_MEMORY_MB,
+    keep_values=False,
+):
+    """
+    Summarizes funds or assets of a long range chunk by chunk. Returns None
+    if there is no data, otherwise a dict with
+    - "start_values" / "end_values": values of every series on the first and
+      last day of the range
+    - "summary": SummaryCalculator.summarize of the daily pivot
+    - "total", "total_change", "total_pct_change": per-day total and its
+      TL / % change, as in the in-memory results
+    - "leaderboards": get_top_bottom_funds of the range
+    - "pivot": the full daily pivot if keep_values (for few series only)
+    - "chunk": the chunk period used
+    """
+    series = list_series(kind, start_date, end_date, portfolio)
+    if not series:
+        return None
+    chunk = choose_chunk(len(series), max_memory_mb)
+
+    first = last = None
+    totals = []
+    values = []
+    for pivot, _, _ in iter_change_chunks(
+        kind, start_date, end_date, portfolio=portfolio, period=chunk
+    ):
+        if first is None:
+            first = pivot.iloc[[0]]
+        last = pivot.iloc[[-1]]
+        totals.append(row_totals(pivot))
+        if keep_values:
+            values.append(pivot)
+
+    # Totals are one number per day, small enough to keep for the whole range
+    total = pd.concat(totals).fillna(0)
+    total.name = kind
+    total_change, total_pct_change = value_changes(total)
+    edges = pd.concat([first, last])
+    return {
+        "start_values": first.iloc[0],
+        "end_values": last.iloc[0],
+        "summary": SummaryCalculator.summarize(edges),
+        "total": total,
+        "total_change": total_change,
+        "total_pct_change": total_pct_change,
+        "leaderboards": get_top_bottom_funds({"pivot": edges}),
+        "pivot": pd.concat(values) if keep_values else None,
+        "chunk": chunk,
+    }
@@ -1,5 +1,8 @@
+import numpy as np
 import pandas as pd
 
+SUMMARY_COLUMNS = ["start_value", "end_value", "total_change_tl", "total_change_pct"]
+
 
 class SummaryCalculator:
     """
@@ -7,24 +10,72 @@ class SummaryCalculator:
     It provides methods to compute start value, end value, total change in TL and percentage.
     """
 
+    @staticmethod
+    def summarize(frame, zero_start_pct=0.0):
+        """
+        Summarizes every column of an aligned frame (rows = dates) at once.
+        Returns a DataFrame indexed by column with start_value, end_value,
+        total_change_tl and total_change_pct.
+        - Missing (NaN) start or end values count as 0, like a series that is
+          not held yet / anymore
+        - total_change_pct is zero_start_pct where the start value is 0
+        """
+        if frame is None or frame.empty:
+            return pd.DataFrame(columns=SUMMARY_COLUMNS)
+
+        values = frame.to_numpy(dtype=float)
+        start = np.nan_to_num(values[0])
+        end = np.nan_to_num(values[-1])
+        change = end - start
+        pct = np.full_like(change, zero_start_pct)
+        np.divide(change * 100, start, out=pct, where=start != 0)
+
+        return pd.DataFrame(
+            {
+                "start_value": start,
+                "end_value": end,
+                "total_change_tl": change,
+                "total_change_pct": pct,
+            },
+            index=frame.columns,
+        )
+
+    @staticmethod
+    def aligned_frame(fund_result, asset_result, include_funds=False):
+        """
+        Builds one frame of all series on a common date index (missing dates = 0):
+        total_portfolio, funds, assets, every asset category and, optionally,
+        every individual fund.
+        """
+        parts = {}
+        if fund_result is not None:
+            parts["funds"] = fund_result["total_funds"]
+        if asset_result is not None:
+            parts["assets"] = asset_result["pivot"].sum(axis=1)
+        if not parts:
+            return None
+
+        frames = [pd.DataFrame(parts)]
+        if asset_result is not None:
+            frames.append(asset_result["pivot"])
+        if include_funds and fund_result is not None:
+            frames.append(fund_result["pivot"])
+
+        combined = pd.concat(frames, axis=1).sort_index().fillna(0)
+        combined.columns.name = None
+        for i, name in enumerate(["funds", "assets"]):
+            if name not in combined:
+                combined.insert(i, name, 0.0)
+        combined.insert(0, "total_portfolio", combined["funds"] + combined["assets"])
+        return combined
+
     @staticmethod
     def _calculate(series):
         if series is None or series.empty:
             return None
 
-        start_value = series.iloc[0]
-        end_value = series.iloc[-1]
-        total_change_tl = end_value - start_value
-        total_change_pct = (
-            (total_change_tl / start_value * 100) if start_value != 0 else 0
-        )
-
-        return {
-            "start_value": start_value,
-            "end_value": end_value,
-            "total_change_tl": total_change_tl,
-            "total_change_pct": total_change_pct,
-        }
+        summary = SummaryCalculator.summarize(series.to_frame()).iloc[0]
+        return summary.to_dict()
 
     @staticmethod
     def from_fund(fund_result):
@@ -38,25 +89,25 @@ class SummaryCalculator:
             return None
         return SummaryCalculator._calculate(asset_result["pivot"][column_name])
 
+    @staticmethod
+    def from_results(fund_result, asset_result, include_funds=False):
+        """
+        Returns the summary of the portfolio, funds, assets and every asset
+        category (and every fund if include_funds) in one vectorized pass.
+        """
+        combined = SummaryCalculator.aligned_frame(
+            fund_result, asset_result, include_funds
+        )
+        if combined is None:
+            return None
+        return SummaryCalculator.summarize(combined)
+
     @staticmethod
     def from_portfolio(fund_result, asset_result):
         if fund_result is None and asset_result is None:
             return None
 
-        fund_total = (
-            fund_result["total_funds"] if fund_result else pd.Series(dtype=float)
-        )
-        asset_total = (
-            asset_result["pivot"].sum(axis=1)
-            if asset_result
-            else pd.Series(0, index=fund_total.index)
-        )
-
-        combined = pd.concat([fund_total, asset_total], axis=1).fillna(0)
-        combined.columns = ["funds", "assets"]
-        combined["total_portfolio"] = combined["funds"] + combined["assets"]
-
-        summary = SummaryCalculator._calculate(combined["total_portfolio"])
-        if summary is not None:
-            summary["daily_total"] = combined
+        combined = SummaryCalculator.aligned_frame(fund_result, asset_result)
+        summary = SummaryCalculator.summarize(combined).loc["total_portfolio"].to_dict()
+        summary["daily_total"] = combined[["funds", "assets", "total_portfolio"]]
         return summary
@@ -0,0 +1,93 @@
+import datetime
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache  # noqa: E402
+import database  # noqa: E402
+from database import DEFAULT_PORTFOLIO, AssetValue, FundValue  # noqa: E402
+
+START = datetime.date(2024, 1, 1)
+DAYS = 200
+
+# Last day of the synthetic history, a Thursday in the middle of a week/month
+END = START + datetime.timedelta(days=DAYS - 1)
+
+
+def _fund_value(code, day):
+    """Returns the value of a synthetic fund on a day offset, or None if not held."""
+    if code == "STEADY":
+        return 1000 + 3 * day + (day % 7) * 11.5
+    if code == "BOUGHT":  # bought mid-range
+        return None if day < 60 else 500 + 2.5 * (day - 60)
+    if code == "SOLD":  # sold within the final week and month
+        return None if day > DAYS - 3 else 2000 - 4 * day
+    if code == "GAPPY":  # every third day missing
+        return None if day % 3 == 0 else 750 + (day % 11) * 9.25
+    raise ValueError(code)
+
+
+def _asset_value(category, day):
+    if category == "crypto":
+        return None if day % 5 == 0 else 300 + (day % 13) * 17
+    return 1200 + day * 0.75
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """
+    A fresh database with a gappy synthetic history: weekends have no data at
+    all, one fund is bought and one sold mid-range and one misses every third
+    day. Returns the list of dates with data.
+    """
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "investments.db"))
+    monkeypatch.setattr(database, "_engine", None)
+    monkeypatch.setattr(database, "_session_factory", None)
+    monkeypatch.setattr(database, "_db_ready", False)
+    cache.clear()
+    database.init_db()
+
+    dates = []
+    session = database.SessionLocal()
+    for day in range(DAYS):
+        date = START + datetime.timedelta(days=day)
+        if date.weekday() >= 5:
+            continue
+        dates.append(date)
+        for code in ("STEADY", "BOUGHT", "SOLD", "GAPPY"):
+            value = _fund_value(code, day)
+            if value is not None:
+                session.add(
+                    FundValue(
+                        portfolio=DEFAULT_PORTFOLIO,
+                        fund_code=code,
+                        fund_name=f"{code} Fund",
+                        value_tl=value,
+                        date=date,
+                    )
+                )
+        for category in ("crypto", "precious_metals"):
+            value = _asset_value(category, day)
+            if value is not None:
+                session.add(
+                    AssetValue(
+                        portfolio=DEFAULT_PORTFOLIO,
+                        category=category,
+                        value_tl=value,
+                        date=date,
+                    )
+                )
+    database.bump_data_version(session, DEFAULT_PORTFOLIO)
+    session.commit()
+    session.close()
+
+    from rollups import rebuild_rollups
+
+    rebuild_rollups(DEFAULT_PORTFOLIO)
+    yield dates
+    cache.clear()
+    if database._engine is not None:
+        database._engine.dispose()
@@ -0,0 +1,87 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+from analyze import get_all_changes, get_series_summaries, get_top_bottom_funds
+from conftest import END, START
+from summary_calculator import SummaryCalculator
+
+DAY = datetime.timedelta(days=1)
+
+RANGES = {
+    "whole history": (START, END),
+    "fund bought mid-range": (START + 30 * DAY, START + 120 * DAY),
+    "fund sold mid-range": (START + 150 * DAY, END),
+    "starts on a weekend": (START + 5 * DAY, START + 40 * DAY),
+    "single day": (START + 9 * DAY, START + 9 * DAY),
+}
+
+
+def _assert_results_equal(sql_result, pandas_result):
+    assert sql_result.keys() == pandas_result.keys()
+    for key, expected in pandas_result.items():
+        actual = sql_result[key]
+        if isinstance(expected, pd.DataFrame):
+            pd.testing.assert_frame_equal(actual, expected, rtol=1e-9)
+        elif isinstance(expected, pd.Series):
+            pd.testing.assert_series_equal(actual, expected, rtol=1e-9)
+        else:
+            assert actual == expected
+
+
+@pytest.mark.parametrize("name", list(RANGES))
+def test_sql_backend_matches_pandas(db, name):
+    start_date, end_date = RANGES[name]
+    sql = get_all_changes(start_date, end_date, resolution="day", backend="sql")
+    expected = get_all_changes(start_date, end_date, resolution="day")
+    for sql_result, pandas_result in zip(sql, expected):
+        assert pandas_result is not None
+        _assert_results_equal(sql_result, pandas_result)
+
+
+def test_history_has_gaps_and_trades(db):
+    funds, _ = get_all_changes(*RANGES["whole history"], resolution="day")
+    pivot = funds["pivot"]
+    assert pivot.index[0] == START and pivot.index[-1] == END
+    assert (pivot["GAPPY"] == 0).any()
+    assert pivot["BOUGHT"].iloc[0] == 0 and pivot["BOUGHT"].iloc[-1] > 0
+    assert pivot["SOLD"].iloc[0] > 0 and pivot["SOLD"].iloc[-1] == 0
+
+
+@pytest.mark.parametrize("backend", ["pandas", "sql"])
+def test_empty_range(db, backend):
+    start_date, end_date = START - 60 * DAY, START - 10 * DAY
+    result = get_all_changes(start_date, end_date, resolution="day", backend=backend)
+    assert result == (None, None)
+
+
+@pytest.mark.parametrize("name", list(RANGES))
+def test_series_summaries_match_summary_calculator(db, name):
+    start_date, end_date = RANGES[name]
+    summaries = get_series_summaries(start_date, end_date)
+    results = get_all_changes(start_date, end_date, resolution="day")
+    for kind, result in zip(("fund", "asset"), results):
+        expected = SummaryCalculator.summarize(result["pivot"])
+        actual = summaries[kind].reindex(expected.index)
+        pd.testing.assert_frame_equal(
+            actual[expected.columns], expected, rtol=1e-9, check_names=False
+        )
+
+
+def test_series_summaries_of_empty_range(db):
+    summaries = get_series_summaries(START - 60 * DAY, START - 10 * DAY)
+    assert summaries == {"fund": None, "asset": None}
+
+
+def test_top_bottom_funds(db):
+    funds, _ = get_all_changes(*RANGES["fund bought mid-range"], resolution="day")
+    top_pct, top_tl, bottom_pct, bottom_tl = get_top_bottom_funds(funds, top_n=2)
+    # Unnamed, so the Analysis page can rename column 0
+    for leaderboard in (top_pct, top_tl, bottom_pct, bottom_tl):
+        assert leaderboard.name is None
+        assert 0 in leaderboard.reset_index().columns
+    # BOUGHT has a zero start value: 0%, not an infinite change
+    assert top_tl.index[0] == "BOUGHT"
+    assert top_pct.index[0] == "STEADY"
+    assert top_pct["BOUGHT"] == 0
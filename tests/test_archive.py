@@ -0,0 +1,46 @@
+import datetime
+import json
+
+import pytest
+
+import archive
+from database import DEFAULT_PORTFOLIO
+
+DATE = datetime.date(2024, 3, 1)
+TEXT = "Fund Code;Value\nAAA;100.5"
+
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path))
+    monkeypatch.setattr(archive, "BLOB_DIR", str(tmp_path / "blobs"))
+    monkeypatch.setattr(archive, "INDEX_PATH", str(tmp_path / "index.json"))
+    monkeypatch.setattr(archive, "LOCK_PATH", str(tmp_path / "index.lock"))
+    return tmp_path
+
+
+@pytest.mark.parametrize("portfolio", ["funds", "assets", "client a"])
+def test_portfolio_names_round_trip(archive_dir, portfolio):
+    archive.store_raw("funds", DATE, TEXT, portfolio=portfolio)
+    assert archive.archived_portfolios() == [portfolio]
+    assert archive.read_raw("funds", DATE, portfolio=portfolio) == TEXT
+
+
+def test_unversioned_indexes_are_converted(archive_dir):
+    archive.store_raw("funds", DATE, TEXT)
+    entries = json.loads((archive_dir / "index.json").read_text())["portfolios"]
+
+    # Written before multi-portfolio support: keyed by kind
+    (archive_dir / "index.json").write_text(json.dumps(entries[DEFAULT_PORTFOLIO]))
+    assert archive.archived_portfolios() == [DEFAULT_PORTFOLIO]
+    assert archive.read_raw("funds", DATE) == TEXT
+
+    # Keyed by portfolio, with a portfolio named like a kind
+    (archive_dir / "index.json").write_text(
+        json.dumps({"funds": entries[DEFAULT_PORTFOLIO]})
+    )
+    assert archive.archived_portfolios() == ["funds"]
+    archive.store_raw("assets", DATE, TEXT, portfolio="funds")
+    index = json.loads((archive_dir / "index.json").read_text())
+    assert index["version"] == archive.INDEX_VERSION
+    assert sorted(index["portfolios"]["funds"]) == ["assets", "funds"]
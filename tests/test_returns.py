@@ -0,0 +1,120 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+import database
+from conftest import END, START, _fund_value
+from database import DEFAULT_PORTFOLIO, FundValue, GrowthIndex
+from returns import (
+    add_cash_flow,
+    catch_up_growth_index,
+    delete_cash_flow,
+    get_returns,
+    list_cash_flows,
+    rebuild_growth_index,
+    refresh_growth_index,
+)
+
+DAY = datetime.timedelta(days=1)
+
+
+def _levels():
+    session = database.SessionLocal()
+    rows = session.query(
+        GrowthIndex.kind, GrowthIndex.series, GrowthIndex.date, GrowthIndex.level
+    ).filter(GrowthIndex.portfolio == DEFAULT_PORTFOLIO)
+    levels = pd.DataFrame(rows.all(), columns=["kind", "series", "date", "level"])
+    session.close()
+    return levels.sort_values(["kind", "series", "date"]).reset_index(drop=True)
+
+
+def _assert_matches_rebuild():
+    incremental = _levels()
+    rebuild_growth_index()
+    pd.testing.assert_frame_equal(incremental, _levels(), rtol=1e-12)
+
+
+def _add_steady_value(date, value):
+    session = database.SessionLocal()
+    session.add(
+        FundValue(
+            portfolio=DEFAULT_PORTFOLIO,
+            fund_code="STEADY",
+            fund_name="STEADY Fund",
+            value_tl=value,
+            date=date,
+        )
+    )
+    database.bump_data_version(session, DEFAULT_PORTFOLIO)
+    session.commit()
+    session.close()
+
+
+def test_incremental_index_matches_rebuild(db):
+    catch_up_growth_index()
+    assert _levels()["date"].max() == END
+
+    # Each update is compared with a rebuild on its own, so that a later
+    # back-dated refresh cannot hide the mistakes of an earlier one
+    add_cash_flow(END - 10 * DAY, "fund", "STEADY", 250.0)
+    _assert_matches_rebuild()
+    add_cash_flow(START + 70 * DAY, "fund", "BOUGHT", 100.0)
+    _assert_matches_rebuild()
+    add_cash_flow(START + 5 * DAY, "fund", "STEADY", -80.0)  # a Saturday
+    _assert_matches_rebuild()
+    add_cash_flow(START + 15 * DAY, "asset", "crypto", 40.0)  # a day without value
+    _assert_matches_rebuild()
+    add_cash_flow(START + 30 * DAY, "fund", "GAPPY", 60.0)
+    flows = list_cash_flows()
+    delete_cash_flow(int(flows.loc[flows["series"] == "BOUGHT", "id"].iloc[0]))
+    _assert_matches_rebuild()
+
+    # New days after the indexed ones, then a flow on the last of them
+    _add_steady_value(END + DAY, 1701.0)
+    _add_steady_value(END + 4 * DAY, 1904.0)
+    catch_up_growth_index()
+    assert _levels()["date"].max() == END + 4 * DAY
+    _assert_matches_rebuild()
+    add_cash_flow(END + 4 * DAY, "fund", "STEADY", 200.0)
+    _assert_matches_rebuild()
+
+    # A back-dated value correction
+    session = database.SessionLocal()
+    session.query(FundValue).filter(
+        FundValue.fund_code == "BOUGHT", FundValue.date == START + 90 * DAY
+    ).update({"value_tl": 620.0})
+    database.bump_data_version(session, DEFAULT_PORTFOLIO)
+    session.commit()
+    session.close()
+    refresh_growth_index(START + 90 * DAY)
+    _assert_matches_rebuild()
+
+
+@pytest.mark.parametrize(
+    "flow_day, counted_day, start_day, end_day",
+    [
+        (3, 3, 2, 4),  # a weekday
+        (5, 7, 4, 8),  # a Saturday, counted on Monday
+    ],
+)
+def test_twr_of_one_deposit(db, flow_day, counted_day, start_day, end_day):
+    add_cash_flow(START + flow_day * DAY, "fund", "STEADY", 100.0)
+    returns = get_returns(START + start_day * DAY, START + end_day * DAY)
+    steady = returns.set_index("series").loc["STEADY"]
+
+    # r_t = (V_t - F_t) / V_{t-1} - 1 on the day the flow counts, chained
+    days = [
+        day
+        for day in range(start_day, end_day + 1)
+        if (START + day * DAY).weekday() < 5
+    ]
+    growth = 1.0
+    for previous, day in zip(days, days[1:]):
+        flow = 100.0 if day == counted_day else 0.0
+        growth *= (_fund_value("STEADY", day) - flow) / _fund_value("STEADY", previous)
+
+    assert steady["twr_pct"] == pytest.approx((growth - 1) * 100, rel=1e-12)
+    assert steady["net_flows"] == 100.0
+    start_value, end_value = (_fund_value("STEADY", d) for d in (start_day, end_day))
+    assert steady["gain_tl"] == pytest.approx(end_value - start_value - 100.0)
@@ -0,0 +1,39 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+from analyze import get_all_changes
+from conftest import END, START
+
+
+def _edges(result, columns):
+    pivot = result["pivot"].reindex(columns=columns, fill_value=0)
+    return pivot.iloc[[0, -1]].reset_index(drop=True)
+
+
+@pytest.mark.parametrize("period", ["week", "month"])
+@pytest.mark.parametrize(
+    "start_date, end_date",
+    [
+        (START, END),  # SOLD is sold within the final week and month
+        (START + datetime.timedelta(days=10), END - datetime.timedelta(days=9)),
+        (START - datetime.timedelta(days=30), END + datetime.timedelta(days=30)),
+    ],
+)
+def test_rollup_edges_match_daily(db, period, start_date, end_date):
+    daily = get_all_changes(start_date, end_date, resolution="day")
+    rolled = get_all_changes(start_date, end_date, resolution=period)
+    for daily_result, rolled_result in zip(daily, rolled):
+        columns = daily_result["pivot"].columns.union(rolled_result["pivot"].columns)
+        assert rolled_result["pivot"].index[0] == daily_result["pivot"].index[0]
+        assert rolled_result["pivot"].index[-1] == daily_result["pivot"].index[-1]
+        pd.testing.assert_frame_equal(
+            _edges(rolled_result, columns), _edges(daily_result, columns)
+        )
+
+
+def test_fund_sold_in_final_period_ends_at_zero(db):
+    funds, _ = get_all_changes(START, END, resolution="week")
+    assert funds["pivot"]["SOLD"].iloc[-1] == 0
+    assert funds["pivot"]["SOLD"].iloc[-2] > 0
@@ -0,0 +1,50 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+from analyze import get_all_changes
+from conftest import END, START
+from streaming import stream_changes
+from summary_calculator import SummaryCalculator
+
+DAY = datetime.timedelta(days=1)
+
+# Tiny enough that even a week of either kind does not fit
+DAY_CHUNKS_MB = 0.001
+
+
+@pytest.mark.parametrize(
+    "max_memory_mb, chunk", [(64, "month"), (DAY_CHUNKS_MB, "day")]
+)
+@pytest.mark.parametrize(
+    "start_date, end_date",
+    [(START, END), (START + 5 * DAY, START + 100 * DAY), (START + 9 * DAY, END)],
+)
+def test_stream_matches_daily_results(db, max_memory_mb, chunk, start_date, end_date):
+    results = get_all_changes(start_date, end_date, resolution="day")
+    for kind, expected in zip(("fund", "asset"), results):
+        streamed = stream_changes(
+            kind, start_date, end_date, max_memory_mb=max_memory_mb, keep_values=True
+        )
+        assert streamed["chunk"] == chunk
+
+        pivot = expected["pivot"]
+        assert set(streamed["pivot"].columns) == set(pivot.columns)
+        pd.testing.assert_frame_equal(
+            streamed["pivot"].reindex(columns=pivot.columns), pivot
+        )
+        total = expected[f"total_{kind}s"]
+        pd.testing.assert_series_equal(streamed["total"], total, check_names=False)
+        pd.testing.assert_series_equal(
+            streamed["total_pct_change"],
+            expected["total_pct_change"],
+            check_names=False,
+        )
+        pd.testing.assert_frame_equal(
+            streamed["summary"], SummaryCalculator.summarize(pivot)
+        )
+
+
+def test_stream_of_empty_range(db):
+    assert stream_changes("fund", START - 60 * DAY, START - 10 * DAY) is None
@@ -0,0 +1,298 @@
+"""
+Data-quality checks for fund and asset values.
+
+All checks run on a pivot (rows = dates, columns = funds / categories) in
+one vectorized pass:
+- outlier:        a daily return far outside the series' rolling distribution
+                  (z-score against the previous `window` returns)
+- scale:          a value that changed by a factor such as 1000x in one day
+- missing_series: a series held on the previous date has no value
+- new_series:     a series appears that was not held on the previous date
+- missing_share:  a large share of the held series is missing (shifted paste)
+- total_jump:     the total of all series jumped by a large percentage
+
+Issues are "warning" or "block". The Add Data page refuses blocked days
+unless overridden. Audit mode runs the same checks over the whole history:
+
+    python validation.py --portfolio default --kind fund --out audit.csv
+"""
+
+import argparse
+import datetime
+import json
+import os
+
+import pandas as pd
+from sqlalchemy import and_
+
+from analyze import KINDS, row_totals
+from database import DEFAULT_PORTFOLIO, AssetValue, FundValue, SessionLocal, ensure_db
+
+THRESHOLDS_FILE = "validation_thresholds.json"
+
+DEFAULT_THRESHOLDS = {
+    "window": 60,  # number of past returns the z-score is computed on
+    "min_history": 10,  # fewer past returns than this skip the z-score check
+    "zscore_warning": 4.0,
+    "zscore_block": 10.0,
+    "scale_block": 20.0,  # one-day change factor (up or down) that blocks
+    "missing_share_block": 0.5,  # share of held series missing that blocks
+    "total_jump_warning_pct": 10.0,
+    "total_jump_block_pct": 50.0,
+}
+
+ISSUE_COLUMNS = ["date", "severity", "check", "series", "value", "message"]
+
+
+def load_thresholds(path=THRESHOLDS_FILE):
+    """Returns the default thresholds, overridden by those in path if it exists."""
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            thresholds.update(json.load(f))
+    return thresholds
+
+
+def _issues(mask, severity, check, values, message):
+    """Returns one issue row for every True cell of a (dates x series) mask."""
+    cells = mask.stack()
+    cells = cells[cells]
+    if cells.empty:
+        return pd.DataFrame(columns=ISSUE_COLUMNS)
+    dates = cells.index.get_level_values(0)
+    series = cells.index.get_level_values(1)
+    picked = values.stack().reindex(cells.index).to_numpy()
+    return pd.DataFrame(
+        {
+            "date": dates,
+            "severity": severity,
+            "check": check,
+            "series": series,
+            "value": picked,
+            "message": [message(s, v) for s, v in zip(series, picked)],
+        }
+    )
+
+
+def _row_issues(mask, severity, check, values, message):
+    """Returns one issue row (not tied to a series) for every True date."""
+    dates = mask.index[mask.to_numpy()]
+    picked = values[mask].to_numpy()
+    return pd.DataFrame(
+        {
+            "date": dates,
+            "severity": severity,
+            "check": check,
+            "series": None,
+            "value": picked,
+            "message": [message(v) for v in picked],
+        },
+        columns=ISSUE_COLUMNS,
+    )
+
+
+def audit_pivot(pivot, thresholds=None):
+    """
+    Runs every check on a value pivot (missing values = not held) and returns
+    the issues of all dates but the first as a DataFrame with ISSUE_COLUMNS.
+    """
+    t = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+    values = pivot.fillna(0)
+    held = values > 0
+    previous = values.shift(1)
+    previous_held = held.shift(1, fill_value=False)
+    both = held & previous_held
+
+    ratio = (values / previous).where(both)
+    returns = ratio - 1
+    past = returns.rolling(t["window"], min_periods=t["min_history"])
+    mean = past.mean().shift(1)
+    std = past.std().shift(1)
+    zscore = ((returns - mean) / std.where(std > 0)).abs()
+
+    missing = previous_held & ~held
+    new = held & ~previous_held
+    new.iloc[0] = False
+    held_before = previous_held.sum(axis=1)
+    missing_share = (missing.sum(axis=1) / held_before.where(held_before > 0)).fillna(0)
+
+    totals = row_totals(values)
+    previous_totals = totals.shift(1)
+    total_jump = ((totals / previous_totals - 1) * 100).where(previous_totals > 0)
+
+    scale = (ratio >= t["scale_block"]) | (ratio <= 1 / t["scale_block"])
+    block_z = zscore >= t["zscore_block"]
+    parts = [
+        _issues(
+            scale,
+            "block",
+            "scale",
+            values,
+            lambda s, v: f"{s}: {v:,.2f} TL is a more than {t['scale_block']:g}x "
+            "change from the previous day.",
+        ),
+        _issues(
+            block_z & ~scale,
+            "block",
+            "outlier",
+            zscore,
+            lambda s, z: f"{s}: daily change is {z:.1f} standard deviations "
+            "from its usual range.",
+        ),
+        _issues(
+            (zscore >= t["zscore_warning"]) & ~block_z & ~scale,
+            "warning",
+            "outlier",
+            zscore,
+            lambda s, z: f"{s}: daily change is {z:.1f} standard deviations "
+            "from its usual range.",
+        ),
+        _issues(
+            missing,
+            "warning",
+            "missing_series",
+            previous,
+            lambda s, v: f"{s}: held on the previous day ({v:,.2f} TL) "
+            "but missing now.",
+        ),
+        _issues(
+            new,
+            "warning",
+            "new_series",
+            values,
+            lambda s, v: f"{s}: new, not held on the previous day.",
+        ),
+        _row_issues(
+            missing_share >= t["missing_share_block"],
+            "block",
+            "missing_share",
+            missing_share,
+            lambda v: f"{v:.0%} of the previously held series are missing.",
+        ),
+        _row_issues(
+            total_jump.abs() >= t["total_jump_block_pct"],
+            "block",
+            "total_jump",
+            total_jump,
+            lambda v: f"The total changed by {v:+.2f}% in one day.",
+        ),
+        _row_issues(
+            (total_jump.abs() >= t["total_jump_warning_pct"])
+            & (total_jump.abs() < t["total_jump_block_pct"]),
+            "warning",
+            "total_jump",
+            total_jump,
+            lambda v: f"The total changed by {v:+.2f}% in one day.",
+        ),
+    ]
+    parts = [part for part in parts if not part.empty]
+    if not parts:
+        return pd.DataFrame(columns=ISSUE_COLUMNS)
+    return (
+        pd.concat(parts, ignore_index=True)
+        .sort_values(["date", "severity", "check"], kind="stable")
+        .reset_index(drop=True)
+    )
+
+
+def _load_pivot(kind, portfolio, start_date=None, end_date=None, last_dates=None):
+    """
+    Returns the value pivot of a kind in a date range (whole history if no
+    range). With last_dates, only the last that many dates before end_date
+    (exclusive) are read.
+    """
+    model = FundValue if kind == "fund" else AssetValue
+    series_column = getattr(model, KINDS[kind])
+    session = SessionLocal()
+    filters = [model.portfolio == portfolio]
+    if last_dates is not None:
+        dates = (
+            session.query(model.date)
+            .filter(and_(model.portfolio == portfolio, model.date < end_date))
+            .distinct()
+            .order_by(model.date.desc())
+            .limit(last_dates)
+            .all()
+        )
+        if not dates:
+            session.close()
+            return pd.DataFrame()
+        filters += [model.date >= dates[-1][0], model.date < end_date]
+    else:
+        if start_date is not None:
+            filters.append(model.date >= start_date)
+        if end_date is not None:
+            filters.append(model.date <= end_date)
+    rows = session.query(model.date, series_column, model.value_tl).filter(
+        and_(*filters)
+    )
+    df = pd.DataFrame(rows.all(), columns=["date", "series", "value_tl"])
+    session.close()
+    if df.empty:
+        return pd.DataFrame()
+    return df.pivot(index="date", columns="series", values="value_tl").sort_index()
+
+
+def validate_day(kind, date, values, portfolio=DEFAULT_PORTFOLIO, thresholds=None):
+    """
+    Checks the values of a new day against the stored history before it.
+    values: dict or Series of fund code / category -> value in TL
+    Returns the issues of that day as a DataFrame with ISSUE_COLUMNS.
+    """
+    t = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+    history = _load_pivot(kind, portfolio, end_date=date, last_dates=t["window"] + 1)
+    if history.empty:
+        return pd.DataFrame(columns=ISSUE_COLUMNS)
+    new_row = pd.DataFrame([pd.Series(values, dtype=float)], index=[date])
+    pivot = pd.concat([history, new_row]).fillna(0)
+    issues = audit_pivot(pivot, t)
+    return issues[issues["date"] == date].reset_index(drop=True)
+
+
+def audit(
+    kind="fund",
+    portfolio=DEFAULT_PORTFOLIO,
+    start_date=None,
+    end_date=None,
+    thresholds=None,
+):
+    """Runs the checks over the stored history and returns all issues."""
+    pivot = _load_pivot(kind, portfolio, start_date, end_date)
+    if pivot.empty:
+        return pd.DataFrame(columns=ISSUE_COLUMNS)
+    return audit_pivot(pivot, thresholds)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Audit stored data for bad values.")
+    parser.add_argument("--portfolio", default=DEFAULT_PORTFOLIO)
+    parser.add_argument("--kind", choices=list(KINDS), default="fund")
+    parser.add_argument("--start", type=datetime.date.fromisoformat, default=None)
+    parser.add_argument("--end", type=datetime.date.fromisoformat, default=None)
+    parser.add_argument(
+        "--blocks-only", action="store_true", help="Only list blocking issues"
+    )
+    parser.add_argument("--out", help="Write all issues to this CSV file")
+    args = parser.parse_args(argv)
+
+    ensure_db()
+    issues = audit(
+        args.kind, args.portfolio, args.start, args.end, load_thresholds()
+    )
+    if args.blocks_only:
+        issues = issues[issues["severity"] == "block"]
+    if issues.empty:
+        print("✅ No issues found.")
+        return
+    print(issues.groupby(["severity", "check"]).size().to_string())
+    print()
+    for row in issues.itertuples():
+        icon = "❌" if row.severity == "block" else "⚠️"
+        print(f"{icon} {row.date} {row.message}")
+    if args.out:
+        issues.to_csv(args.out, index=False)
+        print(f"✅ Issues written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()